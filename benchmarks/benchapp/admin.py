@@ -0,0 +1,16 @@
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from django.contrib import admin
+
+from multilingualfield.admin import MultiLingualFieldModelAdmin
+
+from .models import Article
+
+
+class ArticleAdmin(MultiLingualFieldModelAdmin):
+    list_display = ('title',)
+
+
+admin.site.register(Article, ArticleAdmin)
@@ -0,0 +1,19 @@
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from django.db import models
+
+from multilingualfield import fields
+from multilingualfield.models import MultilingualFieldsMixin
+
+
+class Article(MultilingualFieldsMixin, models.Model):
+    u"""The model every benchmark in the suite reads and writes."""
+    title = fields.MultiLingualCharField(max_length=255)
+    body = fields.MultiLingualTextField(blank=True, null=True)
+    attachment = fields.MultiLingualFileField(
+        upload_to='benchmarks/',
+        blank=True,
+        null=True
+    )
@@ -0,0 +1,59 @@
+u"""
+Compares two JSON reports written by `benchmarks.run`::
+
+    $ python -m benchmarks.compare before.json after.json
+
+Prints the median time of every benchmark present in both reports along
+with the after/before ratio; ratios above `--threshold` are flagged as
+regressions and make the command exit with a non-zero status.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import argparse
+import json
+import sys
+
+KEY_FIELDS = ('benchmark', 'languages', 'text_size', 'rows')
+
+
+def load(path):
+    with open(path) as report:
+        results = json.load(report)[u'results']
+    return dict(
+        (tuple(result[key] for key in KEY_FIELDS), result)
+        for result in results
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=1.1)
+    options = parser.parse_args(argv)
+
+    before, after = load(options.before), load(options.after)
+    regressions = 0
+    row = '{0:<24} {1:>5} {2:>9} {3:>6} {4:>12} {5:>12} {6:>7}'
+    print(row.format(
+        'benchmark', 'langs', 'text_size', 'rows', 'before', 'after', 'ratio'
+    ))
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key][u'median'], after[key][u'median']
+        ratio = new / old if old else float('inf')
+        flag = ''
+        if ratio > options.threshold:
+            regressions += 1
+            flag = ' !'
+        print(row.format(
+            key[0], key[1], key[2], key[3],
+            '{0:.6f}'.format(old), '{0:.6f}'.format(new),
+            '{0:.2f}'.format(ratio)
+        ) + flag)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,432 @@
+u"""
+Benchmark suite for django-multilingualfield.
+
+Every benchmark runs against an in-memory SQLite database and is
+parameterized by the number of languages in `LANGUAGES`, the size (in
+characters) of each translation and the number of rows in the table::
+
+    $ python -m benchmarks.run --languages 2 10 50 --text-size 100 5000 \\
+        --rows 100 --output results.json
+
+Because django can only be configured once per process, each language
+count is measured in its own child process (and the `import` benchmark
+starts a fresh interpreter for every measurement). Results are
+written as JSON (to stdout or `--output`) so runs taken on different
+commits can be compared with `python -m benchmarks.compare`.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+
+# The first fifty entries of the ISO 639-1 list (with 'en' moved to the
+# front) are plenty for exercising the `LANGUAGES` range we care about.
+LANGUAGE_CODES = (
+    'en', 'aa', 'ab', 'af', 'ak', 'am', 'an', 'ar', 'as', 'av', 'ay', 'az',
+    'ba', 'be', 'bg', 'bh', 'bi', 'bm', 'bn', 'bo', 'br', 'bs', 'ca', 'ce',
+    'ch', 'co', 'cr', 'cs', 'cu', 'cv', 'cy', 'da', 'de', 'dv', 'dz', 'ee',
+    'el', 'eo', 'es', 'et', 'eu', 'fa', 'ff', 'fi', 'fj', 'fo', 'fr', 'fy',
+    'ga', 'gd',
+)
+MIN_LANGUAGES, MAX_LANGUAGES = 2, len(LANGUAGE_CODES)
+
+BENCHMARKS = []
+
+
+def benchmark(name):
+    u"""
+    Registers a benchmark. The decorated function receives the benchmark
+    context and returns the zero-argument callable that will be timed
+    (or, if the callable has a true `self_timed` attribute, that returns
+    the duration of a single run itself).
+    """
+    def decorator(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return decorator
+
+
+def configure(language_count, syncdb=True):
+    u"""Configures django for a child process measuring `language_count`."""
+    from django.conf import settings
+    settings.configure(
+        DEBUG=False,
+        SECRET_KEY='multilingualfield-benchmarks',
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        INSTALLED_APPS=(
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'django.contrib.sessions',
+            'django.contrib.admin',
+            'multilingualfield',
+            'benchmarks.benchapp',
+        ),
+        LANGUAGE_CODE='en',
+        LANGUAGES=[
+            (code, 'Language {0}'.format(code))
+            for code in LANGUAGE_CODES[:language_count]
+        ],
+        USE_I18N=True,
+        MEDIA_ROOT='/tmp/multilingualfield-benchmarks/',
+    )
+    if syncdb:
+        from django.core.management import call_command
+        call_command('syncdb', interactive=False, verbosity=0)
+
+
+class Context(object):
+    u"""Shared fixtures for a single (languages, text_size, rows) run."""
+
+    def __init__(self, text_size, rows):
+        from django.test.client import RequestFactory
+        from django.utils.translation import activate
+
+        from django.core.files.storage import default_storage
+        from multilingualfield import LANGUAGES
+        from multilingualfield.datastructures import (
+            MultiLingualFieldFile, MultiLingualFile, MultiLingualText
+        )
+        from .benchapp.models import Article
+
+        activate('en')
+        self.text_size = text_size
+        self.rows = rows
+        self.languages = LANGUAGES
+        self.text = MultiLingualText()
+        for index, (code, verbose) in enumerate(LANGUAGES):
+            setattr(self.text, code, self.make_text(index))
+        self.xml = self.text.as_xml()
+        self.attachment = MultiLingualFile(storage=default_storage)
+        for code, verbose in LANGUAGES:
+            setattr(self.attachment, code, MultiLingualFieldFile(
+                default_storage, 'benchmarks/{0}.pdf'.format(code)
+            ))
+        Article.objects.all().delete()
+        Article.objects.bulk_create([
+            Article(title=self.text, body=self.text, attachment=self.attachment)
+            for i in range(rows)
+        ])
+        self.objects = list(Article.objects.all())
+        self.form_data = dict(
+            ('{0}_{1}'.format(name, index), self.make_text(index))
+            for name in ('title', 'body')
+            for index in range(len(LANGUAGES))
+        )
+        request = RequestFactory().get('/admin/benchapp/article/')
+        request.user = None
+        self.request = request
+
+    def make_text(self, index):
+        u"""Returns a `text_size` long translation unique to `index`."""
+        seed = 'Translation #{0} & <friends> '.format(index)
+        return (seed * (self.text_size // len(seed) + 1))[:self.text_size]
+
+
+@benchmark('parse')
+def bench_parse(context):
+    from multilingualfield.datastructures import MultiLingualText
+    return lambda: MultiLingualText(xml=context.xml)
+
+
+@benchmark('serialize')
+def bench_serialize(context):
+    return context.text.as_xml
+
+
+@benchmark('model_load')
+def bench_model_load(context):
+    from .benchapp.models import Article
+    return lambda: list(Article.objects.all())
+
+
+@benchmark('model_save')
+def bench_model_save(context):
+    def save():
+        for obj in context.objects:
+            obj.save()
+    return save
+
+
+@benchmark('form_validation')
+def bench_form_validation(context):
+    from django.forms.models import modelform_factory
+    from .benchapp.models import Article
+    form_class = modelform_factory(Article, fields=('title', 'body'))
+    return lambda: form_class(data=context.form_data).is_valid()
+
+
+@benchmark('widget_decompress')
+def bench_widget_decompress(context):
+    from multilingualfield.widgets import MultiLingualTextFieldWidget
+    widget = MultiLingualTextFieldWidget()
+    return lambda: widget.decompress(context.text)
+
+
+@benchmark('widget_render')
+def bench_widget_render(context):
+    from multilingualfield.widgets import MultiLingualTextFieldWidget
+    widget = MultiLingualTextFieldWidget()
+    return lambda: widget.render('body', context.text)
+
+
+@benchmark('admin_formset_render')
+def bench_admin_formset_render(context):
+    from functools import partial
+    from django.contrib.admin import site
+    from django.forms.models import modelformset_factory
+    from .benchapp.admin import ArticleAdmin
+    from .benchapp.models import Article
+    model_admin = ArticleAdmin(Article, site)
+    formset_class = modelformset_factory(
+        Article,
+        fields=('title', 'body'),
+        extra=0,
+        formfield_callback=partial(
+            model_admin.formfield_for_dbfield,
+            request=context.request
+        )
+    )
+    return lambda: formset_class(queryset=Article.objects.all()).as_table()
+
+
+@benchmark('template_tags')
+def bench_template_tags(context):
+    from django.template import Context as TemplateContext, Template
+    template = Template(
+        '{% load multilingual_tags %}'
+        '{% for obj in objects %}'
+        '{% get_for_current_language obj.title %}'
+        '{% get_trans_by_code obj.body "en" %}'
+        '{{ obj.body }}'
+        '{% endfor %}'
+    )
+    template_context = TemplateContext({
+        'objects': context.objects,
+        'LANGUAGE_CODE': 'en'
+    })
+    return lambda: template.render(template_context)
+
+
+@benchmark('complete_translations')
+def bench_complete_translations(context):
+    from .benchapp.models import Article
+    return lambda: Article.bulk_complete_translations(context.objects)
+
+
+@benchmark('pickle_dumps')
+def bench_pickle_dumps(context):
+    import pickle
+    from .benchapp.models import Article
+    page = list(Article.objects.all())
+    dumps = lambda: pickle.dumps(page, pickle.HIGHEST_PROTOCOL)
+    dumps.extra = {'size': len(dumps())}
+    return dumps
+
+
+@benchmark('pickle_loads')
+def bench_pickle_loads(context):
+    import pickle
+    from .benchapp.models import Article
+    pickled = pickle.dumps(list(Article.objects.all()), pickle.HIGHEST_PROTOCOL)
+    loads = lambda: pickle.loads(pickled)
+    loads.extra = {'size': len(pickled)}
+    return loads
+
+
+def translation_bytes(objects):
+    u"""
+    Returns the memory (in bytes) taken by the distinct translation strings
+    the multilingual text fields of `objects` hold.
+    """
+    seen = set()
+    size = 0
+    for obj in objects:
+        for name in ('title', 'body'):
+            for key, text in vars(getattr(obj, name)).items():
+                if key != 'languages' and id(text) not in seen:
+                    seen.add(id(text))
+                    size += sys.getsizeof(text)
+    return size
+
+
+@benchmark('memory_load')
+def bench_memory_load(context):
+    from .benchapp.models import Article
+    load = lambda: list(Article.objects.all())
+    load.extra = {'bytes': translation_bytes(load())}
+    return load
+
+
+@benchmark('memory_load_interned')
+def bench_memory_load_interned(context):
+    from multilingualfield.interning import intern_translations
+    from .benchapp.models import Article
+
+    def load():
+        with intern_translations():
+            return list(Article.objects.all())
+    load.extra = {'bytes': translation_bytes(load())}
+    return load
+
+
+@benchmark('import')
+def bench_import(context):
+    u"""
+    Times importing the package in a fresh interpreter (with django
+    already imported), as every worker or management command does.
+    """
+    command = [
+        sys.executable, '-m', 'benchmarks.run', '--import-child',
+        '--languages', str(len(context.languages))
+    ]
+
+    def measure():
+        return float(subprocess.check_output(command).decode('ascii'))
+    measure.self_timed = True
+    return measure
+
+
+def run_import_child(options):
+    u"""Prints how long importing the package takes."""
+    configure(options.languages[0], syncdb=False)
+    import django.contrib.admin
+    import django.db.models
+    import django.forms
+    start = timeit.default_timer()
+    import multilingualfield.admin
+    import multilingualfield.fields
+    import multilingualfield.models
+    import multilingualfield.widgets
+    print(repr(timeit.default_timer() - start))
+
+
+def run_child(options):
+    u"""Runs every selected benchmark for a single language count."""
+    configure(options.languages[0])
+    results = []
+    for text_size in options.text_size:
+        for rows in options.rows:
+            context = Context(text_size, rows)
+            for name, setup in BENCHMARKS:
+                if options.only and name not in options.only:
+                    continue
+                func = setup(context)
+                if getattr(func, 'self_timed', False):
+                    number = 1
+                    timings = sorted(func() for i in range(options.repeat))
+                else:
+                    number = options.number
+                    timings = timeit.Timer(func).repeat(options.repeat, number)
+                    timings = sorted(t / number for t in timings)
+                result = dict(getattr(func, 'extra', {}))
+                results.append(result)
+                result.update({
+                    'benchmark': name,
+                    'languages': options.languages[0],
+                    'text_size': text_size,
+                    'rows': rows,
+                    'min': timings[0],
+                    'median': timings[len(timings) // 2],
+                    'repeat': options.repeat,
+                    'number': number,
+                })
+    json.dump(results, sys.stdout)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            stderr=subprocess.STDOUT
+        ).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options):
+    u"""Spawns one child process per language count and merges results."""
+    results = []
+    for language_count in options.languages:
+        command = [
+            sys.executable, '-m', 'benchmarks.run', '--child',
+            '--languages', str(language_count),
+            '--repeat', str(options.repeat),
+            '--number', str(options.number),
+            '--text-size'
+        ] + [str(size) for size in options.text_size] + [
+            '--rows'
+        ] + [str(rows) for rows in options.rows]
+        if options.only:
+            command += ['--only'] + options.only
+        output = subprocess.check_output(command)
+        results.extend(json.loads(output.decode('utf-8')))
+    import django
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'results': results,
+    }
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+
+def language_count(value):
+    value = int(value)
+    if not MIN_LANGUAGES <= value <= MAX_LANGUAGES:
+        raise argparse.ArgumentTypeError(
+            'language count must be between {0} and {1}'.format(
+                MIN_LANGUAGES, MAX_LANGUAGES
+            )
+        )
+    return value
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--languages', type=language_count, nargs='+', default=[2, 10, 50]
+    )
+    parser.add_argument('--text-size', type=int, nargs='+', default=[100])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=10)
+    parser.add_argument(
+        '--only', nargs='+', choices=[name for name, setup in BENCHMARKS],
+        help='Only run the named benchmarks.'
+    )
+    parser.add_argument('--output', help='Write the JSON report here.')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument(
+        '--import-child', action='store_true', help=argparse.SUPPRESS
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    options = parse_args()
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if options.import_child:
+        run_import_child(options)
+    elif options.child:
+        run_child(options)
+    else:
+        run(options)
@@ -1,7 +1,5 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-from django.conf import settings
-from django.core.exceptions import ImproperlyConfigured
 from django.utils.translation import ugettext_lazy as _
 
 # Error messages
@@ -17,9 +15,13 @@ REQUIRED_ERROR = _(u'This multi-lingual field is required therefore you must pro
 XML_SYNTAX_ERROR = _(u"Multi Lingual field instances must be created with either an instance of "
     u"`multilingualfield.fields.MultiLingualText` or a block of XML in the following format:")
 
-LANGUAGES = getattr(settings, u'LANGUAGES', None)
-if not LANGUAGES:
-    raise ImproperlyConfigured(LANGUAGES_REQUIRED_ERROR)
+from .conf import LazySetting
 
-LANGUAGES_REPLACEMENT = getattr(settings, u'LANGUAGES_REPLACEMENT', {})
-LANGUAGES_REQUIRED_TEXT = u'({0})'.format(u', '.join((v for c, v in LANGUAGES if c not in LANGUAGES_REPLACEMENT)))
+# These are bound to the settings when first used (see conf.py)
+LANGUAGES = LazySetting(u'LANGUAGES')
+LANGUAGES_REPLACEMENT = LazySetting(u'LANGUAGES_REPLACEMENT')
+LANGUAGES_REQUIRED_TEXT = LazySetting(u'LANGUAGES_REQUIRED_TEXT')
+
+# Values (in characters of XML) longer than this will be compressed by
+# MultiLingualTextField instances that have `compress=True`
+COMPRESS_THRESHOLD = LazySetting(u'COMPRESS_THRESHOLD')
@@ -1,6 +1,151 @@
-from django.contrib.admin import ModelAdmin
+import operator
 
-from . import widgets, fields
+from django.conf.urls import patterns, url
+from django.contrib.admin import ModelAdmin, SimpleListFilter
+from django.contrib.admin.util import quote, unquote
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import PermissionDenied
+from django.core.urlresolvers import reverse
+from django.db import connections, models
+from django.http import Http404, HttpResponse
+from django.utils.translation import ugettext_lazy as _
+
+from . import widgets, fields, LANGUAGES
+from .cache import current_language_code
+from .sql import translation_present_sql, translation_sql
+from .utils import escape_xml_text, unescape_xml_text
+
+TRANSLATION_ALIAS = u'{0}_translation'
+SEARCH_LOOKUPS = {
+    u'^': u'{0}%',
+    u'=': u'{0}',
+    u'': u'%{0}%',
+}
+
+
+def _multilingual_fields(model):
+    multilingual = (fields.MultiLingualTextField, fields.MultiLingualFileField)
+    return [f for f in model._meta.fields if isinstance(f, multilingual)]
+
+
+def _column(queryset, field, connection):
+    qn = connection.ops.quote_name
+    return u'{0}.{1}'.format(qn(queryset.model._meta.db_table), qn(field.column))
+
+
+def _escape_like(value):
+    return value.replace(u'!', u'!!').replace(u'%', u'!%').replace(u'_', u'!_')
+
+
+def translation_column(field):
+    u"""
+    Returns a `list_display` callable showing the translation of `field`
+    selected by MultilingualChangeList (which also sorts by it).
+    """
+    alias = TRANSLATION_ALIAS.format(field.name)
+
+    def column(obj):
+        return unescape_xml_text(getattr(obj, alias, u''))
+    column.short_description = field.verbose_name
+    column.admin_order_field = field.name
+    column.multilingual_field = field
+    return column
+
+
+class MultilingualChangeList(ChangeList):
+    u"""
+    A ChangeList that selects only the active language of the multilingual
+    fields it displays or sorts by (instead of their whole values).
+    """
+
+    def get_ordering(self, request, queryset):
+        ordering = super(MultilingualChangeList, self).get_ordering(
+            request, queryset
+        )
+        by_name = dict((f.name, f) for f in _multilingual_fields(self.model))
+        self.ordered_translation_fields = []
+        result = []
+        for item in ordering:
+            name = item.lstrip(u'-') if isinstance(item, basestring) else None
+            if name in by_name:
+                self.ordered_translation_fields.append(by_name[name])
+                item = item[:len(item) - len(name)] + TRANSLATION_ALIAS.format(
+                    name
+                )
+            result.append(item)
+        return result
+
+    def get_queryset(self, request):
+        qs = super(MultilingualChangeList, self).get_queryset(request)
+        translated = getattr(self, u'ordered_translation_fields', []) + [
+            getattr(column, u'multilingual_field')
+            for column in self.list_display
+            if hasattr(column, u'multilingual_field')
+        ]
+        if not translated:
+            return qs
+        connection = connections[qs.db]
+        language_code = current_language_code()
+        for field in set(translated):
+            sql, params = translation_sql(
+                connection, _column(qs, field, connection), language_code
+            )
+            qs = qs.extra(
+                select={TRANSLATION_ALIAS.format(field.name): sql},
+                select_params=params
+            )
+        return qs.defer(*set(f.name for f in translated))
+
+
+class TranslationCompletenessListFilter(SimpleListFilter):
+    u"""
+    A `list_filter` for the objects whose multilingual fields (all of them
+    or those in `field_names`) are, or aren't, all translated into
+    a language.
+
+    Uses LIKE conditions only (no regular expressions) so the database
+    doesn't have to run a regex over every value. Compressed values are
+    never considered complete.
+    """
+    title = _(u'translation')
+    parameter_name = u'translation'
+    field_names = None
+
+    def lookups(self, request, model_admin):
+        choices = []
+        for code, verbose in LANGUAGES:
+            choices.append((code, _(u'Complete in %s') % verbose))
+            choices.append((
+                u'-' + code, _(u'Incomplete in %s') % verbose
+            ))
+        return choices
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return None
+        language_code = value.lstrip(u'-')
+        if language_code not in [code for code, verbose in LANGUAGES]:
+            return None
+        connection = connections[queryset.db]
+        conditions, params = [], []
+        for field in _multilingual_fields(queryset.model):
+            if self.field_names is not None and field.name not in self.field_names:
+                continue
+            condition, condition_params = translation_present_sql(
+                u'COALESCE({0}, \'\')'.format(
+                    _column(queryset, field, connection)
+                ),
+                language_code
+            )
+            conditions.append(condition)
+            params.extend(condition_params)
+        if not conditions:
+            return None
+        where = u' AND '.join(conditions)
+        if value.startswith(u'-'):
+            where = u'NOT ({0})'.format(where)
+        return queryset.extra(where=[where], params=params)
 
 
 class MultiLingualFieldModelAdmin(ModelAdmin):
@@ -15,3 +160,166 @@ class MultiLingualFieldModelAdmin(ModelAdmin):
             'widget': widgets.MultiLingualClearableFileInputDjangoAdminWidget
         },
     }
+    # The language multilingual `search_fields` are searched in (defaults
+    # to the active language); 'title__es' searches a given one
+    search_language = None
+    # When True the change form renders only the active language of every
+    # multilingual field and loads the others on demand
+    lazy_multilingual_widgets = False
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        urls = patterns(
+            '',
+            url(
+                r'^(.+)/multilingual/(\w+)/$',
+                self.admin_site.admin_view(self.translation_widget_view),
+                name='%s_%s_multilingual_widget' % info
+            ),
+        )
+        return urls + super(MultiLingualFieldModelAdmin, self).get_urls()
+
+    def get_form(self, request, obj=None, **kwargs):
+        u"""
+        Points the multilingual widgets to `translation_widget_view` when
+        `lazy_multilingual_widgets` is True (and `obj` exists).
+        """
+        form = super(MultiLingualFieldModelAdmin, self).get_form(
+            request, obj, **kwargs
+        )
+        if self.lazy_multilingual_widgets and obj is not None:
+            info = self.model._meta.app_label, self.model._meta.model_name
+            for name, field in form.base_fields.items():
+                if isinstance(
+                        field.widget, widgets.MultiLingualFieldBaseMixInWidget):
+                    field.widget.load_url = reverse(
+                        'admin:%s_%s_multilingual_widget' % info,
+                        args=(quote(obj.pk), name),
+                        current_app=self.admin_site.name
+                    )
+        return form
+
+    def translation_widget_view(self, request, object_id, field_name):
+        u"""
+        Returns the input of the `language` (a GET parameter) translation of
+        `field_name` for the object `object_id`, as rendered in its change
+        form.
+        """
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None:
+            raise Http404
+        if not self.has_change_permission(request, obj):
+            raise PermissionDenied
+        codes = [code for code, verbose in LANGUAGES]
+        language_code = request.GET.get('language')
+        field = self.get_form(request, obj).base_fields.get(field_name)
+        widget = getattr(field, 'widget', None)
+        if language_code not in codes or not isinstance(
+                widget, widgets.MultiLingualFieldBaseMixInWidget):
+            raise Http404
+        index = codes.index(language_code)
+        value = widget.decompress(getattr(obj, field_name))[index]
+        attrs = widget.build_attrs(
+            id=request.GET.get('id', 'id_%s_%s' % (field_name, index))
+        )
+        return HttpResponse(widget.render_language(
+            request.GET.get('name', field_name), index, value, attrs
+        ))
+
+    def get_changelist(self, request, **kwargs):
+        return MultilingualChangeList
+
+    def get_list_display(self, request):
+        u"""
+        Replaces the multilingual fields in `list_display` with columns
+        showing only their active language, except those `list_editable` or
+        `list_display_links` refer to by name.
+        """
+        by_name = dict((f.name, f) for f in _multilingual_fields(self.model))
+        by_name_only = set(self.list_editable or ()) | set(
+            self.list_display_links or ()
+        )
+        return [
+            translation_column(by_name[name])
+            if isinstance(name, basestring) and name in by_name
+            and name not in by_name_only else name
+            for name in super(MultiLingualFieldModelAdmin, self).get_list_display(
+                request
+            )
+        ]
+
+    def get_search_results(self, request, queryset, search_term):
+        u"""
+        Searches the multilingual `search_fields` within a single language
+        extracted by the database instead of the whole XML values.
+        """
+        by_name = dict((f.name, f) for f in _multilingual_fields(self.model))
+        codes = [code for code, verbose in LANGUAGES]
+        regular, translated = [], []
+        for search_field in self.search_fields:
+            prefix = search_field[0] if search_field[:1] in u'^=@' else u''
+            name, sep, language_code = search_field[len(prefix):].partition(
+                u'__'
+            )
+            if name in by_name and (not sep or language_code in codes):
+                translated.append((
+                    prefix, by_name[name],
+                    language_code or self.search_language
+                    or current_language_code()
+                ))
+            else:
+                regular.append(search_field)
+        if not translated or not search_term:
+            return super(MultiLingualFieldModelAdmin, self).get_search_results(
+                request, queryset, search_term
+            )
+
+        # Every term of a bit is ORed into a single condition on `queryset`
+        # itself; the regular lookups (which may join other tables) go into
+        # a subquery of their own, so no DISTINCT is needed
+        connection = connections[queryset.db]
+        qn = connection.ops.quote_name
+        pk_column = u'{0}.{1}'.format(
+            qn(queryset.model._meta.db_table), qn(queryset.model._meta.pk.column)
+        )
+        orm_lookups = [self._construct_search(str(f)) for f in regular]
+        for bit in search_term.split():
+            conditions, params = [], []
+            for prefix, field, language_code in translated:
+                sql, sql_params = translation_sql(
+                    connection, _column(queryset, field, connection),
+                    language_code
+                )
+                conditions.append(
+                    u'UPPER({0}) LIKE UPPER(%s) ESCAPE \'!\''.format(sql)
+                )
+                params.extend(sql_params + [
+                    SEARCH_LOOKUPS.get(prefix, SEARCH_LOOKUPS[u'']).format(
+                        _escape_like(escape_xml_text(bit))
+                    )
+                ])
+            if orm_lookups:
+                matches = queryset.model._default_manager.filter(reduce(
+                    operator.or_, [
+                        models.Q(**{orm_lookup: bit})
+                        for orm_lookup in orm_lookups
+                    ]
+                )).values(u'pk')
+                sql, sql_params = matches.query.sql_with_params()
+                conditions.append(u'{0} IN ({1})'.format(pk_column, sql))
+                params.extend(sql_params)
+            queryset = queryset.extra(
+                where=[u'({0})'.format(u' OR '.join(conditions))],
+                params=params
+            )
+        return queryset, False
+
+    def _construct_search(self, field_name):
+        if field_name.startswith('^'):
+            return "%s__istartswith" % field_name[1:]
+        elif field_name.startswith('='):
+            return "%s__iexact" % field_name[1:]
+        elif field_name.startswith('@'):
+            return "%s__search" % field_name[1:]
+        else:
+            return "%s__icontains" % field_name
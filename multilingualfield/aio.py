@@ -0,0 +1,81 @@
+u"""
+Helpers for using multilingual fields off the request thread.
+
+`run_in_executor` runs blocking storage calls on a bounded thread pool
+(`MULTILINGUALFIELD_STORAGE_WORKERS` threads, 4 by default) and returns a
+`concurrent.futures.Future`.
+
+`override_language` pins the language multilingual values resolve to for
+the current thread, regardless of `django.utils.translation.get_language()`.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import threading
+from contextlib import contextmanager
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import get_language
+
+from . import conf
+
+MISSING_FUTURES_ERROR = (
+    u'Asynchronous storage operations require `concurrent.futures` '
+    u'(install the `futures` package).'
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    u"""Returns the (lazily created) storage thread pool."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                try:
+                    from concurrent.futures import ThreadPoolExecutor
+                except ImportError:
+                    raise ImproperlyConfigured(MISSING_FUTURES_ERROR)
+                _executor = ThreadPoolExecutor(
+                    max_workers=conf.settings.STORAGE_WORKERS
+                )
+    return _executor
+
+
+def run_in_executor(func, *args, **kwargs):
+    u"""
+    Runs `func(*args, **kwargs)` on the storage thread pool and returns a
+    `concurrent.futures.Future`.
+    """
+    return get_executor().submit(func, *args, **kwargs)
+
+
+_language = threading.local()
+
+
+def get_active_language():
+    u"""
+    Returns the language pinned by `override_language` or, if none is,
+    `django.utils.translation.get_language()`.
+    """
+    return getattr(_language, u'code', None) or get_language()
+
+
+@contextmanager
+def override_language(language_code):
+    u"""
+    Makes multilingual values resolve to `language_code` in the current
+    thread::
+
+        with override_language('es'):
+            title = unicode(article.title)
+    """
+    previous = getattr(_language, u'code', None)
+    _language.code = language_code
+    try:
+        yield
+    finally:
+        _language.code = previous
@@ -0,0 +1,192 @@
+u"""
+An optional cache of decoded, single-language multilingual values.
+
+Set `MULTILINGUALFIELD_CACHE` to the alias of one of your `CACHES` to
+enable it. Values are cached per object, field and language so pages that
+render the same translations over and over can skip both the database
+column and the XML decoding. Every object gets a version number which is
+part of all of its keys; saving or deleting a `MultilingualFieldsMixin`
+instance bumps it, invalidating everything cached for that object at once.
+
+`MULTILINGUALFIELD_CACHE_TIMEOUT` sets the timeout of cached values (it
+defaults to the timeout of the cache backend).
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import time
+
+from django.core.cache import get_cache
+from django.db.models.signals import post_delete, post_save
+
+from . import conf, LANGUAGES
+from .aio import get_active_language
+
+KEY_PREFIX = u'multilingualfield'
+
+
+def is_enabled():
+    u"""Tells whether `MULTILINGUALFIELD_CACHE` is set."""
+    return bool(conf.settings.CACHE)
+
+
+def get_translation_cache():
+    u"""Returns the cache backend to use or None if caching is disabled."""
+    alias = conf.settings.CACHE
+    return get_cache(alias) if alias else None
+
+
+def current_language_code():
+    u"""
+    Returns the language code of the active thread (or context, see
+    `multilingualfield.aio.override_language`), falling back to its
+    generic variant ('es-mx' -> 'es') when the former isn't in LANGUAGES.
+    """
+    current = get_active_language()
+    codes = [code for code, verbose in LANGUAGES]
+    if current not in codes and current[:2] in codes:
+        return current[:2]
+    return current
+
+
+def _model_label(model):
+    # Deferred models are proxies; their instances share the concrete
+    # model's keys
+    model = model._meta.concrete_model
+    return u'{0}.{1}'.format(model._meta.app_label, model._meta.model_name)
+
+
+def version_key(model, pk):
+    return u'{0}:{1}:{2}:version'.format(KEY_PREFIX, _model_label(model), pk)
+
+
+def translation_key(model, pk, version, field_name, language_code):
+    return u'{0}:{1}:{2}:{3}:{4}:{5}'.format(
+        KEY_PREFIX, _model_label(model), pk, version, field_name, language_code
+    )
+
+
+def _new_version():
+    # Versions are seeded from the clock (rather than starting at 1) so an
+    # evicted version key can never resurrect stale entries.
+    return int(time.time() * 1000)
+
+
+def get_versions(cache, model, pks):
+    u"""Returns a {pk: version} dict, initializing missing versions."""
+    keys = dict((version_key(model, pk), pk) for pk in pks)
+    found = cache.get_many(keys.keys())
+    versions = {}
+    for key, pk in keys.items():
+        if key in found:
+            versions[pk] = found[key]
+        else:
+            version = _new_version()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+            versions[pk] = version
+    return versions
+
+
+def invalidate(model, pk):
+    u"""Invalidates every cached translation of object `pk` of `model`."""
+    cache = get_translation_cache()
+    if cache is None:
+        return
+    try:
+        cache.incr(version_key(model, pk))
+    except ValueError:
+        # No version means nothing has been cached under the current one
+        pass
+
+
+def get_translations(model, pks, field_name, language_code=None,
+                     instances=None):
+    u"""
+    Returns a {pk: value} dict of the `language_code` (defaults to the
+    language of the active thread) translations of `field_name` for the
+    objects of `model` whose primary keys are in `pks`.
+
+    Cache misses are read from `instances` (a {pk: instance} dict) when the
+    field is already loaded on them or, otherwise, with a single query.
+    Every language of a value read on a cache miss is cached.
+    """
+    language_code = language_code or current_language_code()
+    field = model._meta.get_field(field_name)
+    instances = instances or {}
+    cache = get_translation_cache()
+    if cache is None:
+        return dict(
+            (pk, getattr(
+                _value_of(model, field, pk, instances), language_code, u''
+            ))
+            for pk in pks
+        )
+
+    versions = get_versions(cache, model, pks)
+    keys = dict(
+        (translation_key(model, pk, versions[pk], field_name, language_code), pk)
+        for pk in pks
+    )
+    found = cache.get_many(keys.keys())
+    translations = dict((keys[key], value) for key, value in found.items())
+
+    missing = [pk for pk in pks if pk not in translations]
+    unloaded = [
+        pk for pk in missing
+        if field.attname not in getattr(instances.get(pk), u'__dict__', {})
+    ]
+    if unloaded:
+        rows = model._default_manager.filter(pk__in=unloaded).values_list(
+            u'pk', field.attname
+        )
+        for pk, raw_value in rows:
+            instances[pk] = field.to_python(raw_value)
+    to_cache = {}
+    for pk in missing:
+        value = _value_of(model, field, pk, instances)
+        for code, verbose in LANGUAGES:
+            to_cache[translation_key(
+                model, pk, versions[pk], field_name, code
+            )] = getattr(value, code, u'')
+        translations[pk] = getattr(value, language_code, u'')
+    if to_cache:
+        cache.set_many(to_cache, conf.settings.CACHE_TIMEOUT)
+    return translations
+
+
+def get_translation(model, pk, field_name, language_code=None, instance=None):
+    u"""Single-object variant of `get_translations`."""
+    return get_translations(
+        model, [pk], field_name, language_code,
+        instances={pk: instance} if instance is not None else None
+    ).get(pk, u'')
+
+
+def _value_of(model, field, pk, instances):
+    u"""
+    Returns the decoded value of `field` for object `pk` from `instances`
+    (which holds either model instances or already-decoded values).
+    """
+    instance = instances.get(pk)
+    if instance is None:
+        instance = instances[pk] = model._default_manager.get(pk=pk)
+    if isinstance(instance, model):
+        return getattr(instance, field.attname)
+    return instance
+
+
+def invalidate_on_change(sender, instance, **kwargs):
+    from .models import MultilingualFieldsMixin
+    if is_enabled() and issubclass(sender, MultilingualFieldsMixin):
+        invalidate(sender, instance.pk)
+
+post_save.connect(
+    invalidate_on_change,
+    dispatch_uid=u'multilingualfield.cache.post_save'
+)
+post_delete.connect(
+    invalidate_on_change,
+    dispatch_uid=u'multilingualfield.cache.post_delete'
+)
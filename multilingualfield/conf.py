@@ -0,0 +1,187 @@
+u"""
+Lazily-bound configuration.
+
+`settings` reads the settings `multilingualfield` depends on the first time
+one of them is used (rather than when the package is imported) and keeps
+the tables derived from `LANGUAGES`. Everything is rebuilt when one of
+those settings changes (i.e. within `override_settings`), so tests can
+switch languages freely.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from django.core.signals import setting_changed
+except ImportError:  # Django < 1.8
+    from django.test.signals import setting_changed
+
+SETTINGS = (
+    u'LANGUAGES',
+    u'LANGUAGES_REPLACEMENT',
+    u'MULTILINGUALFIELD_CACHE',
+    u'MULTILINGUALFIELD_CACHE_TIMEOUT',
+    u'MULTILINGUALFIELD_COMPRESS_THRESHOLD',
+    u'MULTILINGUALFIELD_COVERAGE_SUMMARY',
+    u'MULTILINGUALFIELD_INSTRUMENTATION',
+    u'MULTILINGUALFIELD_INTERN_POOL_SIZE',
+    u'MULTILINGUALFIELD_STORAGE_WORKERS',
+)
+
+
+class Settings(object):
+    u"""
+    The settings of `multilingualfield` and the tables derived from them:
+
+    * `LANGUAGES`: `settings.LANGUAGES` (as a tuple)
+    * `LANGUAGE_CODES`: the codes in `LANGUAGES`
+    * `LANGUAGE_INDEXES`: a {code: position in `LANGUAGES`} dict
+    * `LANGUAGES_REPLACEMENT`: `settings.LANGUAGES_REPLACEMENT`
+    * `LANGUAGES_REQUIRED_TEXT`: the names of the languages whose
+      translations are required, as shown in validation errors
+    * `CACHE`: `settings.MULTILINGUALFIELD_CACHE`
+    * `CACHE_TIMEOUT`: `settings.MULTILINGUALFIELD_CACHE_TIMEOUT`
+    * `COMPRESS_THRESHOLD`: `settings.MULTILINGUALFIELD_COMPRESS_THRESHOLD`
+    * `COVERAGE_SUMMARY`: `settings.MULTILINGUALFIELD_COVERAGE_SUMMARY`
+    * `INSTRUMENTATION`: `settings.MULTILINGUALFIELD_INSTRUMENTATION`
+    * `INTERN_POOL_SIZE`: `settings.MULTILINGUALFIELD_INTERN_POOL_SIZE`
+    * `STORAGE_WORKERS`: `settings.MULTILINGUALFIELD_STORAGE_WORKERS`
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = None
+
+    def _load(self):
+        from django.conf import settings
+        from django.core.cache.backends.base import DEFAULT_TIMEOUT
+        from . import LANGUAGES_REQUIRED_ERROR
+        languages = tuple(
+            (code, verbose)
+            for code, verbose in getattr(settings, u'LANGUAGES', None) or ()
+        )
+        if not languages:
+            raise ImproperlyConfigured(LANGUAGES_REQUIRED_ERROR)
+        replacement = getattr(settings, u'LANGUAGES_REPLACEMENT', {})
+        return {
+            u'LANGUAGES': languages,
+            u'LANGUAGE_CODES': tuple(code for code, verbose in languages),
+            u'LANGUAGE_INDEXES': dict(
+                (code, index) for index, (code, verbose) in enumerate(languages)
+            ),
+            u'LANGUAGES_REPLACEMENT': replacement,
+            u'LANGUAGES_REQUIRED_TEXT': u'({0})'.format(u', '.join(
+                verbose for code, verbose in languages
+                if code not in replacement
+            )),
+            u'CACHE': getattr(settings, u'MULTILINGUALFIELD_CACHE', None),
+            u'CACHE_TIMEOUT': getattr(
+                settings, u'MULTILINGUALFIELD_CACHE_TIMEOUT', DEFAULT_TIMEOUT
+            ),
+            u'COMPRESS_THRESHOLD': getattr(
+                settings, u'MULTILINGUALFIELD_COMPRESS_THRESHOLD', 1024
+            ),
+            u'COVERAGE_SUMMARY': getattr(
+                settings, u'MULTILINGUALFIELD_COVERAGE_SUMMARY', False
+            ),
+            u'INSTRUMENTATION': getattr(
+                settings, u'MULTILINGUALFIELD_INSTRUMENTATION', False
+            ),
+            u'INTERN_POOL_SIZE': getattr(
+                settings, u'MULTILINGUALFIELD_INTERN_POOL_SIZE', 0
+            ),
+            u'STORAGE_WORKERS': getattr(
+                settings, u'MULTILINGUALFIELD_STORAGE_WORKERS', 4
+            ),
+        }
+
+    def __getattr__(self, name):
+        values = self._values
+        if values is None:
+            with self._lock:
+                if self._values is None:
+                    self._values = self._load()
+                values = self._values
+        try:
+            return values[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def reset(self):
+        u"""Makes the next access read the settings again."""
+        self._values = None
+
+settings = Settings()
+
+
+class LazySetting(object):
+    u"""
+    Stands for the `name` attribute of `settings`, delegating to its
+    current value, so module-level names (like `multilingualfield.LANGUAGES`)
+    can be imported before the settings are read.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    @property
+    def _value(self):
+        return getattr(settings, self._name)
+
+    def __getattr__(self, name):
+        if name.startswith(u'_'):
+            raise AttributeError(name)
+        return getattr(self._value, name)
+
+    def __reduce__(self):
+        return LazySetting, (self._name,)
+
+    def __iter__(self):
+        return iter(self._value)
+
+    def __len__(self):
+        return len(self._value)
+
+    def __getitem__(self, key):
+        return self._value[key]
+
+    def __contains__(self, item):
+        return item in self._value
+
+    def __eq__(self, other):
+        return self._value == other
+
+    def __ne__(self, other):
+        return self._value != other
+
+    def __nonzero__(self):
+        return bool(self._value)
+    __bool__ = __nonzero__
+
+    def __int__(self):
+        return int(self._value)
+
+    def __unicode__(self):
+        return unicode(self._value)
+
+    def __str__(self):
+        return str(self._value)
+
+    def __format__(self, format_spec):
+        return format(self._value, format_spec)
+
+    def __repr__(self):
+        return repr(self._value)
+
+
+def reset_settings(setting, **kwargs):
+    if setting in SETTINGS:
+        settings.reset()
+
+setting_changed.connect(
+    reset_settings, dispatch_uid=u'multilingualfield.conf.setting_changed'
+)
@@ -0,0 +1,246 @@
+u"""
+Translation coverage: how many objects have each multilingual field
+translated into each language.
+
+`translation_coverage` computes the numbers for a model with a single
+aggregate query. Set `MULTILINGUALFIELD_COVERAGE_SUMMARY = True` to also
+keep them in the `TranslationCoverage` table, which is updated
+incrementally whenever a `MultilingualFieldsMixin` instance is saved or
+deleted, so dashboards can read precomputed numbers instead of scanning
+content tables. Populate (or repair) the table with the
+`rebuild_translation_coverage` management command.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from . import conf, LANGUAGES
+from .sql import compressed_sql, translation_present_sql
+
+
+def model_label(model):
+    model = model._meta.concrete_model
+    return u'{0}.{1}'.format(model._meta.app_label, model._meta.model_name)
+
+
+def is_translated(value):
+    u"""
+    Returns True if `value` (a translation or a MultiLingualFieldFile) is
+    not empty.
+    """
+    return bool(getattr(value, u'name', value))
+
+
+def translation_coverage(model, field_names=None, language_codes=None,
+                         queryset=None):
+    u"""
+    Returns a dict with the number of objects (`total`) and, for each field
+    and language, the number of objects with a non-empty translation::
+
+        {
+            'total': 120,
+            'fields': {
+                'title': {'en': 120, 'es': 97},
+                'body': {'en': 118, 'es': 64},
+            }
+        }
+
+    `field_names` defaults to every multilingual field of `model` and
+    `language_codes` to every language in LANGUAGES. Pass `queryset` to
+    restrict the objects that are counted.
+
+    Counts are computed with one aggregate query; the (rare) compressed
+    values the database can't look into are decoded in Python.
+    """
+    if field_names is None:
+        field_names = [f.name for f in model.multilingual_fields()]
+    if language_codes is None:
+        language_codes = [code for code, verbose in LANGUAGES]
+    if queryset is None:
+        queryset = model._default_manager.all()
+    using = queryset.db
+    connection = connections[using]
+    qn = connection.ops.quote_name
+
+    columns, params = [u'COUNT(*)'], []
+    for name in field_names:
+        column = qn(model._meta.get_field(name).column)
+        for code in language_codes:
+            condition, condition_params = translation_present_sql(column, code)
+            columns.append(
+                u'SUM(CASE WHEN {0} THEN 1 ELSE 0 END)'.format(condition)
+            )
+            params.extend(condition_params)
+        condition, condition_params = compressed_sql(column)
+        columns.append(u'SUM(CASE WHEN {0} THEN 1 ELSE 0 END)'.format(condition))
+        params.extend(condition_params)
+    subquery, subquery_params = queryset.values(u'pk').query.get_compiler(
+        using
+    ).as_sql()
+    sql = u'SELECT {0} FROM {1} WHERE {2} IN ({3})'.format(
+        u', '.join(columns),
+        qn(model._meta.db_table),
+        qn(model._meta.pk.column),
+        subquery
+    )
+    cursor = connection.cursor()
+    cursor.execute(sql, params + list(subquery_params))
+    row = iter(cursor.fetchone())
+
+    coverage = {u'total': next(row) or 0, u'fields': {}}
+    for name in field_names:
+        counts = coverage[u'fields'][name] = {}
+        for code in language_codes:
+            counts[code] = next(row) or 0
+        if next(row):
+            _count_compressed(
+                model, name, language_codes, queryset, counts, qn
+            )
+    return coverage
+
+
+def _count_compressed(model, field_name, language_codes, queryset, counts,
+                      qn):
+    field = model._meta.get_field(field_name)
+    condition, params = compressed_sql(u'{0}.{1}'.format(
+        qn(model._meta.db_table), qn(field.column)
+    ))
+    rows = queryset.extra(where=[condition], params=params).values_list(
+        field.attname, flat=True
+    )
+    for raw_value in rows.iterator():
+        value = field.to_python(raw_value)
+        for code in language_codes:
+            if is_translated(getattr(value, code, None)):
+                counts[code] += 1
+
+
+def translation_flags(model, value_of):
+    u"""
+    Returns a {(field_name, language_code): bool} dict describing which
+    translations are present. `value_of(field)` returns the decoded value of
+    a multilingual field.
+    """
+    flags = {}
+    for field in model.multilingual_fields():
+        value = value_of(field)
+        for code, verbose in LANGUAGES:
+            flags[(field.name, code)] = is_translated(
+                getattr(value, code, None)
+            )
+    return flags
+
+
+def rebuild_summary(model):
+    u"""Recomputes the `TranslationCoverage` rows for `model`."""
+    from .models import TranslationCoverage
+    label = model_label(model)
+    using = router.db_for_write(TranslationCoverage)
+    # Readers never see the rows of `model` deleted but not yet recreated
+    with transaction.atomic(using=using):
+        coverage = translation_coverage(model)
+        rows = TranslationCoverage.objects.using(using)
+        rows.filter(model=label).delete()
+        rows.bulk_create([
+            TranslationCoverage(
+                model=label,
+                field_name=name,
+                language_code=code,
+                translated=translated,
+                total=coverage[u'total']
+            )
+            for name, counts in coverage[u'fields'].items()
+            for code, translated in counts.items()
+        ])
+
+
+def _update_summary(model, changes, total_change=0):
+    u"""
+    Applies `changes` ({(field_name, language_code): +1 or -1}) and
+    `total_change` to the summary rows of `model`.
+    """
+    from .models import TranslationCoverage
+    rows = TranslationCoverage.objects.filter(model=model_label(model))
+    if total_change:
+        rows.update(total=F(u'total') + total_change)
+    for (field_name, code), change in changes.items():
+        if change:
+            rows.filter(field_name=field_name, language_code=code).update(
+                translated=F(u'translated') + change
+            )
+
+
+def record_translation_changes(model, changes):
+    u"""
+    Applies `changes` ({(field_name, language_code): change in the number of
+    translated objects}) made without saving instances (i.e. by
+    `exchange.import_translations`) to the summary rows of `model`.
+    """
+    if _is_tracked(model):
+        _update_summary(model, changes)
+
+
+def _is_tracked(sender):
+    from .models import MultilingualFieldsMixin
+    return conf.settings.COVERAGE_SUMMARY and issubclass(
+        sender, MultilingualFieldsMixin
+    )
+
+
+def remember_stored_flags(sender, instance, raw=False, **kwargs):
+    u"""Reads which translations are stored before `instance` is saved."""
+    if raw or not _is_tracked(sender) or instance.pk is None:
+        return
+    fields = list(sender.multilingual_fields())
+    rows = sender._default_manager.db_manager(
+        router.db_for_write(sender, instance=instance)
+    ).filter(pk=instance.pk).values_list(*[f.attname for f in fields])
+    for row in rows:
+        stored = dict(zip([f.name for f in fields], row))
+        instance._stored_translation_flags = translation_flags(
+            sender, lambda field: field.to_python(stored[field.name])
+        )
+
+
+def update_summary_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw or not _is_tracked(sender):
+        return
+    before = instance.__dict__.pop(u'_stored_translation_flags', None)
+    after = translation_flags(
+        sender, lambda field: getattr(instance, field.attname)
+    )
+    changes = dict(
+        (key, int(present) - int(bool(before and before.get(key))))
+        for key, present in after.items()
+    )
+    _update_summary(sender, changes, total_change=1 if created else 0)
+
+
+def update_summary_on_delete(sender, instance, **kwargs):
+    if not _is_tracked(sender):
+        return
+    flags = translation_flags(
+        sender, lambda field: getattr(instance, field.attname)
+    )
+    _update_summary(
+        sender,
+        dict((key, -1) for key, present in flags.items() if present),
+        total_change=-1
+    )
+
+pre_save.connect(
+    remember_stored_flags,
+    dispatch_uid=u'multilingualfield.coverage.pre_save'
+)
+post_save.connect(
+    update_summary_on_save,
+    dispatch_uid=u'multilingualfield.coverage.post_save'
+)
+post_delete.connect(
+    update_summary_on_delete,
+    dispatch_uid=u'multilingualfield.coverage.post_delete'
+)
@@ -4,12 +4,47 @@ from __future__ import (
 
 from django.core.exceptions import ImproperlyConfigured
 from django.core.files.base import File
+from django.core.files.storage import default_storage
 from django.utils.encoding import smart_str
-from django.utils.translation import get_language
 
-from lxml import objectify, etree
+from . import (
+    conf, instrumentation, utils, LANGUAGES, UNKNOWN_LANGUAGE_CODE_ERROR
+)
+from .aio import get_active_language, run_in_executor
+from .instrumentation import instrumented, ENCODE, FALLBACK
+
 
-from . import utils, LANGUAGES, INVALID_XML_ERROR, UNKNOWN_LANGUAGE_CODE_ERROR
+def _pickled_codes(instance):
+    u"""
+    Returns the language codes to pickle `instance` with: LANGUAGES' codes
+    unless `instance` carries other language-keyed attributes.
+    """
+    # The same tuple is used every time so pickling many instances at once
+    # only stores it once
+    codes = conf.settings.LANGUAGE_CODES
+    keys = instance.__dict__
+    if len(keys) != len(codes) + 1 or not all(code in keys for code in codes):
+        codes = tuple(key for key in instance.__dict__ if key != u'languages')
+    return codes
+
+
+def _unpickle_multilingual_text(codes, values):
+    instance = MultiLingualText.__new__(MultiLingualText)
+    instance.languages = LANGUAGES
+    for code, verbose in LANGUAGES:
+        setattr(instance, code, u'')
+    instance.__dict__.update(zip(codes, values))
+    return instance
+
+
+def _unpickle_multilingual_file(codes, names, storage, renditions=None):
+    instance = MultiLingualFile.__new__(MultiLingualFile)
+    instance.languages = LANGUAGES
+    instance._storage = storage or default_storage
+    instance._names = dict((code, None) for code, verbose in LANGUAGES)
+    instance._names.update(zip(codes, names))
+    instance._renditions = renditions or {}
+    return instance
 
 
 class MultiLingualText(object):
@@ -63,25 +98,49 @@ class MultiLingualText(object):
         """
         Returns the attribute on this object associated with the current
         language of the active thread (as provided by
-        django.utils.translation.get_language)
+        django.utils.translation.get_language) or the language set with
+        `multilingualfield.aio.override_language`.
         """
-        current = get_language()
+        return self.get_for_language(get_active_language())
 
+    def get_for_language(self, language_code):
+        """
+        Returns the attribute on this object associated with
+        `language_code`, falling back to its generic variant
+        ('es-mx' -> 'es') if `language_code` isn't listed in LANGUAGES.
+
+        Doesn't depend on the language of the active thread so it is safe to
+        call from asynchronous code.
+        """
         try:
-            val = getattr(self, current)
+            val = getattr(self, language_code)
         except AttributeError:
-            if current not in [code for code, verbose in LANGUAGES]:
+            if language_code not in [code for code, verbose in LANGUAGES]:
                 raise_exception = True
-                if '-' in current:
+                if '-' in language_code:
                     try:
-                        val = getattr(self, current[:2])
+                        val = getattr(self, language_code[:2])
                     except AttributeError:
                         pass
                     else:
                         raise_exception = False
+                        if instrumentation.is_enabled():
+                            instrumentation.record(
+                                FALLBACK,
+                                detail=u'{0} -> {1}'.format(
+                                    language_code, language_code[:2]
+                                )
+                            )
                 if raise_exception:
+                    if instrumentation.is_enabled():
+                        instrumentation.record(
+                            FALLBACK,
+                            detail=u'{0} -> ImproperlyConfigured'.format(
+                                language_code
+                            )
+                        )
                     raise ImproperlyConfigured(
-                        UNKNOWN_LANGUAGE_CODE_ERROR.format(current)
+                        UNKNOWN_LANGUAGE_CODE_ERROR.format(language_code)
                     )
             else:
                 val = ''
@@ -95,8 +154,10 @@ class MultiLingualText(object):
         val = self.get_for_current_language()
         return smart_str(val, errors='strict')
 
+    @instrumented(ENCODE)
     def as_xml(self):
         u"""Returns this instance as XML."""
+        from lxml import etree
         xml_to_return = etree.Element(u'languages')
         for key, value in self.__dict__.iteritems():
             if key != u'languages':
@@ -105,6 +166,17 @@ class MultiLingualText(object):
                 xml_to_return.append(language)
         return etree.tostring(xml_to_return)
 
+    def __reduce__(self):
+        u"""
+        Pickles only the language codes and their values (instead of the
+        whole `__dict__`, which includes a reference to LANGUAGES).
+        """
+        codes = _pickled_codes(self)
+        return (
+            _unpickle_multilingual_text,
+            (codes, tuple(getattr(self, code) for code in codes))
+        )
+
     def __nonzero__(self):
         u"""
         Provides 'truth value testing' to MultiLingualText instances
@@ -128,11 +200,33 @@ class MultiLingualFieldFile(File):
 
     Functions almost identically to django's FieldFile
     """
-    def __init__(self, storage, name):
+    def __init__(self, storage, name, renditions=None):
         super(MultiLingualFieldFile, self).__init__(None, name)
         self.name = name
-        self.storage = storage
+        self.storage = storage or default_storage
         self._committed = True
+        # {rendition name: file name} (see `multilingualfield.renditions`)
+        self._renditions = renditions or {}
+
+    def rendition(self, name):
+        u"""
+        Returns the `name` rendition of this file (a MultiLingualFieldFile)
+        or None if it hasn't been generated.
+        """
+        file_name = self._renditions.get(name)
+        if file_name is None:
+            return None
+        return MultiLingualFieldFile(storage=self.storage, name=file_name)
+
+    @property
+    def renditions(self):
+        u"""
+        A {rendition name: MultiLingualFieldFile} dict with the generated
+        renditions of this file (`file.renditions.thumb.url` in templates).
+        """
+        return dict(
+            (name, self.rendition(name)) for name in self._renditions
+        )
 
     @property
     def file(self):
@@ -161,11 +255,49 @@ class MultiLingualFieldFile(File):
         return self.storage.size(self.name) if self._committed else \
             self.file.size
 
+    def __reduce__(self):
+        u"""
+        Pickles the file name, storage and renditions only; the default
+        storage is pickled as None.
+        """
+        return (
+            MultiLingualFieldFile,
+            (
+                self.storage if self.storage is not default_storage else None,
+                self.name
+            ) + ((self._renditions,) if self._renditions else ())
+        )
+
     def open(self, mode=u'rb'):
         self.file.open(mode)
     # open() doesn't alter the file's contents, but it does reset the pointer
     open.alters_data = True
 
+    def save(self, name, content):
+        u"""Saves `content` to `storage` (as `name`) and points to it."""
+        self.name = self.storage.save(name, content)
+        self._committed = True
+    save.alters_data = True
+
+    # Versions of the storage operations above that run on the bounded thread
+    # pool in `multilingualfield.aio` and return a `concurrent.futures.Future`
+    def aopen(self, mode=u'rb'):
+        def open_file():
+            self.open(mode)
+            return self
+        return run_in_executor(open_file)
+    aopen.alters_data = True
+
+    def asize(self):
+        return run_in_executor(lambda: self.size)
+
+    def aurl(self):
+        return run_in_executor(lambda: self.url)
+
+    def asave(self, name, content):
+        return run_in_executor(self.save, name, content)
+    asave.alters_data = True
+
     @property
     def closed(self):
         file = getattr(self, u'_file', None)
@@ -183,7 +315,9 @@ class MultiLingualFile(object):
     language.
 
     Uses MultiLingualFieldFile instances (or None) for language-keyed
-    attributes.
+    attributes. Only the file names are kept until a language is accessed,
+    when its MultiLingualFieldFile is created; `as_xml`, pickling and truth
+    value testing work from the names without creating any.
     """
 
     def __init__(self, xml=None, storage=None):
@@ -208,53 +342,128 @@ class MultiLingualFile(object):
           `path/to/file2.ext` from `storage`
         """
         self.languages = LANGUAGES
-        # Converting XML (passed-in as `xml`) to a python object via lxml
+        self._renditions = {}
         if xml and storage:
-            try:
-                xml_as_python_object = objectify.fromstring(xml)
-            except etree.XMLSyntaxError:
-                raise Exception(INVALID_XML_ERROR + ' MultiLingualText')
-            else:
-                # Creating a dictionary of all the languages passed in the
-                # value XML with the language code (i.e. 'en', 'de',
-                # 'fr') as the key
-                text_dict = {}
-                try:
-                    text_dict = dict(
-                        (unicode(l.get(u'code')), unicode(l.text or u''))
-                        for l in xml_as_python_object.language
-                    )
-                except AttributeError:
-                    # Empty fields throw-off lxml and cause an AttributeError
-                    pass
-                for code, verbose in LANGUAGES:
-                    setattr(
-                        self,
-                        code,
-                        MultiLingualFieldFile(
-                            storage=storage,
-                            name=text_dict[code]
-                        ) if code in text_dict else None
-                    )
+            utils.construct_MultiLingualFile_from_xml(xml, self, storage)
         else:
-            for code, verbose in LANGUAGES:
-                setattr(self, code, None)
+            self._storage = storage or default_storage
+            self._names = dict((code, None) for code, verbose in LANGUAGES)
+
+    def __getattr__(self, name):
+        u"""Creates the file of language `name` when first accessed."""
+        names = self.__dict__.get(u'_names')
+        if names is None or name not in names:
+            raise AttributeError(name)
+        file_name = names[name]
+        value = MultiLingualFieldFile(
+            storage=self._storage, name=file_name,
+            renditions=self._renditions.get(name)
+        ) if file_name is not None else None
+        setattr(self, name, value)
+        return value
+
+    @property
+    def storage(self):
+        u"""The storage the files of this instance are in."""
+        return self._storage
+
+    def file_names(self):
+        u"""
+        Returns a {language_code: file name (or None)} dict, without
+        creating any MultiLingualFieldFile.
+        """
+        names = dict(self._names)
+        for key, value in self.__dict__.iteritems():
+            if key != u'languages' and not key.startswith(u'_'):
+                names[key] = value.name if value is not None else None
+        return names
+
+    def renditions_for(self, language_code):
+        u"""
+        Returns the {rendition name: file name} dict of the renditions of
+        the `language_code` file (empty once that file is replaced).
+        """
+        name = self.file_names().get(language_code)
+        if not name or name != self._names.get(language_code):
+            return {}
+        return self._renditions.get(language_code, {})
+
+    def set_renditions(self, language_code, renditions):
+        u"""
+        Records `renditions` ({rendition name: file name}) for the
+        `language_code` file, unless it has been replaced since it was
+        loaded.
+        """
+        name = self.file_names().get(language_code)
+        if not name or name != self._names.get(language_code):
+            return
+        merged = dict(self._renditions.get(language_code, {}))
+        merged.update(renditions)
+        self._renditions = dict(self._renditions)
+        self._renditions[language_code] = merged
+        # The file is created again (with its renditions) when next accessed
+        self.__dict__.pop(language_code, None)
+
+    def keep_renditions(self, other):
+        u"""
+        Copies the renditions recorded on `other` (a MultiLingualFile) for
+        the files this instance still has.
+        """
+        for code, verbose in LANGUAGES:
+            renditions = other.renditions_for(code)
+            if renditions and (
+                    other.file_names().get(code) == self._names.get(code)):
+                self.set_renditions(code, renditions)
 
     def __repr__(self):
-        current = get_language()
-        try:
-            val = getattr(self, current)
-        except AttributeError:
+        current = get_active_language()
+        if current in self.__dict__ or current in self._names:
+            name = self.file_names()[current]
+        else:
             if current not in [code for code, verbose in LANGUAGES]:
+                if instrumentation.is_enabled():
+                    instrumentation.record(
+                        FALLBACK,
+                        detail=u'{0} -> ImproperlyConfigured'.format(current)
+                    )
                 raise ImproperlyConfigured(
                     UNKNOWN_LANGUAGE_CODE_ERROR.format(current)
                 )
             return None
-        return smart_str(val, errors='ignore')
+        return smart_str(name or u'', errors='ignore')
 
     def __unicode__(self):
         return unicode(self.__repr__()) or u''
 
+    def __reduce__(self):
+        u"""
+        Pickles the language codes, file names and (unless it is the default
+        storage) the storage of the files in this instance.
+        """
+        names = self.file_names()
+        codes = conf.settings.LANGUAGE_CODES
+        if len(names) != len(codes) or not all(code in names for code in codes):
+            codes = tuple(names)
+        storage = next(
+            (
+                value.storage for key, value in self.__dict__.iteritems()
+                if isinstance(value, MultiLingualFieldFile)
+            ),
+            self._storage
+        )
+        renditions = dict(
+            (code, self.renditions_for(code)) for code in codes
+            if self.renditions_for(code)
+        )
+        return (
+            _unpickle_multilingual_file,
+            (
+                codes,
+                tuple(names[code] for code in codes),
+                storage if storage is not default_storage else None
+            ) + ((renditions,) if renditions else ())
+        )
+
     def __nonzero__(self):
         """
         Provides 'truth value testing' based on the current language thread.
@@ -269,12 +478,23 @@ class MultiLingualFile(object):
         else:
             return False
 
+    @instrumented(ENCODE)
     def as_xml(self):
         u"""Returns this instance as XML."""
+        from lxml import etree
         xml_to_return = etree.Element(u'languages')
-        for key, value in self.__dict__.iteritems():
-            if key != u'languages':
-                language = etree.Element(u'language', code=key)
-                language.text = value.name if value else u''
-                xml_to_return.append(language)
+        names = self.file_names()
+        for key, name in names.iteritems():
+            language = etree.Element(u'language', code=key)
+            language.text = name or u''
+            xml_to_return.append(language)
+        # Renditions are recorded after every language, along with the file
+        # they were generated from
+        for key in names:
+            for name, file_name in sorted(self.renditions_for(key).items()):
+                rendition = etree.Element(
+                    u'rendition', code=key, name=name, source=names[key]
+                )
+                rendition.text = file_name
+                xml_to_return.append(rendition)
         return etree.tostring(xml_to_return)
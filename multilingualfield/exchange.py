@@ -0,0 +1,569 @@
+u"""
+Exchanging translations with translators as XLIFF 1.2, XLIFF 2.0, CSV or
+PO files.
+
+Every translation unit is identified by `app_label.modelname:pk:field` and
+carries the source-language text along with the target-language text.
+
+`export_translations` walks a queryset in primary key order, a chunk at a
+time, decoding only the two languages it needs and writing each unit to
+the output stream as soon as it is read, so exports run in constant memory
+regardless of the size of the table.
+
+`import_translations` streams a file back in, a batch of units at a time:
+the current values of the objects in a batch are read with one query per
+model, only the target language is merged into them and the results are
+written back with an UPDATE per field (and per database parameter limit)
+inside a transaction. The translation cache and coverage summary are then
+updated and `signals.translations_changed` is sent for every object
+changed.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import csv
+import re
+from collections import defaultdict, namedtuple
+from itertools import islice
+from xml.sax.saxutils import escape, quoteattr
+
+from django.db import connections, router, transaction
+from django.db.models import get_model
+from lxml import etree
+
+from . import cache, coverage, utils
+from .signals import translations_changed
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_BATCH_SIZE = 500
+
+TranslationUnit = namedtuple(u'TranslationUnit', u'id source target')
+
+
+def unit_id(model, pk, field_name):
+    model = model._meta.concrete_model
+    return u'{0}.{1}:{2}:{3}'.format(
+        model._meta.app_label, model._meta.model_name, pk, field_name
+    )
+
+
+def parse_unit_id(value):
+    u"""
+    Returns the (model, pk, field) a unit id refers to. Raises ValueError
+    if it doesn't refer to a multilingual field of an installed model.
+    """
+    from .fields import MultiLingualTextField
+    try:
+        label, pk, field_name = value.split(u':', 2)
+        app_label, model_name = label.split(u'.')
+    except ValueError:
+        raise ValueError(u"'{0}' isn't a valid unit id.".format(value))
+    model = get_model(app_label, model_name)
+    if model is None:
+        raise ValueError(u"Unknown model '{0}'.".format(label))
+    try:
+        field = model._meta.get_field(field_name)
+    except Exception:
+        field = None
+    if not isinstance(field, MultiLingualTextField):
+        raise ValueError(
+            u"'{0}' isn't a multilingual text field of '{1}'.".format(
+                field_name, label
+            )
+        )
+    return model, model._meta.pk.to_python(pk), field
+
+
+def iter_chunks(queryset, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    u"""
+    Yields lists of `(pk, raw_value, raw_value, ...)` rows (one raw,
+    undecoded value per field in `fields`) from `queryset`.
+
+    Rows are read `chunk_size` at a time with primary key range queries
+    (WHERE pk > last_pk ORDER BY pk LIMIT chunk_size) so no more than one
+    chunk is ever held in memory.
+    """
+    queryset = queryset.order_by(u'pk')
+    attnames = [field.attname for field in fields]
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk.values_list(u'pk', *attnames)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1][0]
+
+
+def iter_units(queryset, field_names, source_language, target_language,
+               chunk_size=DEFAULT_CHUNK_SIZE):
+    u"""
+    Yields a TranslationUnit for every field in `field_names` of every
+    object in `queryset`.
+    """
+    model = queryset.model
+    fields = [model._meta.get_field(name) for name in field_names]
+    languages = (source_language, target_language)
+    for rows in iter_chunks(queryset, fields, chunk_size):
+        for row in rows:
+            for field, raw_value in zip(fields, row[1:]):
+                text_dict = utils.extract_languages(raw_value, languages)
+                yield TranslationUnit(
+                    unit_id(model, row[0], field.name),
+                    text_dict.get(source_language, u''),
+                    text_dict.get(target_language, u'')
+                )
+
+
+class Writer(object):
+    u"""
+    Writes translation units to `stream` (a file opened in binary mode)
+    as they come, encoded as UTF-8.
+    """
+
+    def __init__(self, stream, source_language, target_language):
+        self.stream = stream
+        self.source_language = source_language
+        self.target_language = target_language
+
+    def write(self, text):
+        self.stream.write(text.encode(u'utf-8'))
+
+    def write_header(self):
+        pass
+
+    def write_footer(self):
+        pass
+
+
+class Xliff12Writer(Writer):
+
+    def write_header(self):
+        self.write(
+            u'<?xml version="1.0" encoding="UTF-8"?>\n'
+            u'<xliff version="1.2" '
+            u'xmlns="urn:oasis:names:tc:xliff:document:1.2">\n'
+            u'<file original="multilingualfield" datatype="plaintext" '
+            u'source-language={0} target-language={1}>\n<body>\n'.format(
+                quoteattr(self.source_language),
+                quoteattr(self.target_language)
+            )
+        )
+
+    def write_unit(self, unit):
+        self.write(
+            u'<trans-unit id={0}><source>{1}</source>'
+            u'<target>{2}</target></trans-unit>\n'.format(
+                quoteattr(unit.id), escape(unit.source), escape(unit.target)
+            )
+        )
+
+    def write_footer(self):
+        self.write(u'</body>\n</file>\n</xliff>\n')
+
+
+class Xliff20Writer(Writer):
+
+    def write_header(self):
+        self.write(
+            u'<?xml version="1.0" encoding="UTF-8"?>\n'
+            u'<xliff version="2.0" '
+            u'xmlns="urn:oasis:names:tc:xliff:document:2.0" '
+            u'srcLang={0} trgLang={1}>\n'
+            u'<file id="multilingualfield">\n'.format(
+                quoteattr(self.source_language),
+                quoteattr(self.target_language)
+            )
+        )
+
+    def write_unit(self, unit):
+        self.write(
+            u'<unit id={0}><segment><source>{1}</source>'
+            u'<target>{2}</target></segment></unit>\n'.format(
+                quoteattr(unit.id), escape(unit.source), escape(unit.target)
+            )
+        )
+
+    def write_footer(self):
+        self.write(u'</file>\n</xliff>\n')
+
+
+class CsvWriter(Writer):
+    u"""Writes `id,source,target` rows (with a header row)."""
+
+    def __init__(self, *args, **kwargs):
+        super(CsvWriter, self).__init__(*args, **kwargs)
+        self.writer = csv.writer(self.stream)
+
+    def writerow(self, row):
+        self.writer.writerow([value.encode(u'utf-8') for value in row])
+
+    def write_header(self):
+        self.writerow([u'id', self.source_language, self.target_language])
+
+    def write_unit(self, unit):
+        self.writerow(unit)
+
+
+def po_quote(text):
+    return u'"{0}"'.format(
+        text.replace(u'\\', u'\\\\').replace(u'"', u'\\"')
+        .replace(u'\n', u'\\n').replace(u'\r', u'\\r').replace(u'\t', u'\\t')
+    )
+
+
+class PoWriter(Writer):
+    u"""
+    Writes a gettext catalog: the unit id is the `msgctxt`, the source
+    text the `msgid` and the target text the `msgstr`.
+    """
+
+    def write_header(self):
+        self.write(
+            u'msgid ""\nmsgstr ""\n'
+            u'"Content-Type: text/plain; charset=UTF-8\\n"\n'
+            u'"Language: {0}\\n"\n'
+            u'"X-Source-Language: {1}\\n"\n\n'.format(
+                self.target_language, self.source_language
+            )
+        )
+
+    def write_unit(self, unit):
+        self.write(u'msgctxt {0}\nmsgid {1}\nmsgstr {2}\n\n'.format(
+            po_quote(unit.id), po_quote(unit.source), po_quote(unit.target)
+        ))
+
+
+class Reader(object):
+    u"""
+    Iterating over a Reader yields the TranslationUnits in `stream` (a file
+    opened in binary mode) one at a time. `source_language` and
+    `target_language` are read from the file when it records them.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.source_language = None
+        self.target_language = None
+
+
+class XliffReader(Reader):
+    u"""Reads both XLIFF 1.2 and XLIFF 2.0 files."""
+
+    def __iter__(self):
+        for event, element in etree.iterparse(
+                self.stream, events=(u'start', u'end')):
+            tag = etree.QName(element).localname
+            if event == u'start':
+                if tag == u'xliff' and element.get(u'srcLang'):
+                    self.source_language = element.get(u'srcLang')
+                    self.target_language = element.get(u'trgLang')
+                elif tag == u'file' and element.get(u'source-language'):
+                    self.source_language = element.get(u'source-language')
+                    self.target_language = element.get(u'target-language')
+                continue
+            if tag not in (u'trans-unit', u'unit'):
+                continue
+            texts = dict(
+                (etree.QName(child).localname, child.text or u'')
+                for child in element.iter()
+                if etree.QName(child).localname in (u'source', u'target')
+            )
+            yield TranslationUnit(
+                element.get(u'id'),
+                unicode(texts.get(u'source', u'')),
+                unicode(texts.get(u'target', u''))
+            )
+            # Free the parsed unit (and any preceding siblings)
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+
+class CsvReader(Reader):
+    u"""Reads the `id,source,target` files written by CsvWriter."""
+
+    def __iter__(self):
+        rows = csv.reader(self.stream)
+        header = [value.decode(u'utf-8') for value in next(rows)]
+        self.source_language, self.target_language = header[1:3]
+        for row in rows:
+            if row:
+                yield TranslationUnit(*[value.decode(u'utf-8') for value in row])
+
+
+PO_UNESCAPES = {u'n': u'\n', u'r': u'\r', u't': u'\t'}
+
+
+def po_unquote(text):
+    return re.sub(
+        r'\\(.)',
+        lambda match: PO_UNESCAPES.get(match.group(1), match.group(1)),
+        text.strip()[1:-1]
+    )
+
+
+class PoReader(Reader):
+    u"""Reads the gettext catalogs written by PoWriter."""
+
+    def __iter__(self):
+        entry, keyword = {}, None
+        for line in self.stream:
+            line = line.decode(u'utf-8').strip()
+            if not line:
+                unit = self.make_unit(entry)
+                if unit:
+                    yield unit
+                entry, keyword = {}, None
+            elif line.startswith(u'"') and keyword:
+                entry[keyword] += po_unquote(line)
+            elif not line.startswith(u'#'):
+                keyword, value = line.split(None, 1)
+                entry[keyword] = po_unquote(value)
+        unit = self.make_unit(entry)
+        if unit:
+            yield unit
+
+    def make_unit(self, entry):
+        if u'msgctxt' not in entry:
+            # The header entry
+            header = entry.get(u'msgstr', u'')
+            for attribute, name in ((u'target_language', u'Language'),
+                                    (u'source_language', u'X-Source-Language')):
+                match = re.search(
+                    r'^{0}: (.*)$'.format(name), header, re.MULTILINE
+                )
+                if match:
+                    setattr(self, attribute, match.group(1).strip())
+            return None
+        return TranslationUnit(
+            entry[u'msgctxt'], entry.get(u'msgid', u''),
+            entry.get(u'msgstr', u'')
+        )
+
+
+READERS = {
+    u'xliff12': XliffReader,
+    u'xliff20': XliffReader,
+    u'csv': CsvReader,
+    u'po': PoReader,
+}
+
+WRITERS = {
+    u'xliff12': Xliff12Writer,
+    u'xliff20': Xliff20Writer,
+    u'csv': CsvWriter,
+    u'po': PoWriter,
+}
+FORMATS = sorted(WRITERS)
+
+
+def export_translations(queryset, field_names, source_language,
+                        target_language, stream, format=u'xliff12',
+                        chunk_size=DEFAULT_CHUNK_SIZE, skip_translated=False):
+    u"""
+    Writes the `source_language` and `target_language` translations of
+    `field_names` for every object in `queryset` to `stream` (a file opened
+    in binary mode) in `format` (one of FORMATS) and returns the number of
+    units written.
+
+    Units with an empty source text are skipped, as are units that already
+    have a target text when `skip_translated` is True.
+    """
+    writer = WRITERS[format](stream, source_language, target_language)
+    writer.write_header()
+    count = 0
+    for unit in iter_units(queryset, field_names, source_language,
+                           target_language, chunk_size):
+        if not unit.source or (skip_translated and unit.target):
+            continue
+        writer.write_unit(unit)
+        count += 1
+    writer.write_footer()
+    return count
+
+
+class ImportResult(object):
+    u"""
+    What `import_translations` did (or, on a dry run, would have done):
+
+    * `updated`: the number of translations written
+    * `unchanged`: the number of translations that already matched
+    * `conflicts`: (unit id, reason) tuples for the units that were skipped
+    """
+
+    def __init__(self):
+        self.updated = 0
+        self.unchanged = 0
+        self.conflicts = []
+
+    def conflict(self, unit, reason):
+        self.conflicts.append((unit.id, reason))
+
+
+def bulk_update_column(model, field, values, using):
+    u"""
+    Sets `field` to `values[pk]` for every pk in `values` (a dict of
+    already-prepared database values) with as few UPDATEs as the database's
+    limit on parameters allows.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    pk_column = qn(model._meta.pk.column)
+    items = list(values.items())
+    # Every pk takes three parameters
+    batch_size = max(connection.ops.bulk_batch_size(
+        [model._meta.pk, field, model._meta.pk], items
+    ), 1)
+    for start in range(0, len(items), batch_size):
+        cases, params, pks = [], [], []
+        for pk, value in items[start:start + batch_size]:
+            cases.append(u'WHEN %s THEN %s')
+            params.extend([pk, value])
+            pks.append(pk)
+        sql = u'UPDATE {0} SET {1} = CASE {2} {3} END WHERE {2} IN ({4})'.format(
+            qn(model._meta.db_table),
+            qn(field.column),
+            pk_column,
+            u' '.join(cases),
+            u', '.join([u'%s'] * len(pks))
+        )
+        connection.cursor().execute(sql, params + pks)
+
+
+def notify_import(model, changed, target_language, using):
+    u"""
+    Invalidates the cached translations of the objects of `model` whose
+    `changed` ({pk: [field, ...]}) fields got a `target_language`
+    translation and sends `signals.translations_changed` for each of them.
+    """
+    if cache.is_enabled():
+        for pk in changed:
+            cache.invalidate(model, pk)
+    if not translations_changed.has_listeners(model):
+        return
+    instances = model._default_manager.db_manager(using).in_bulk(list(changed))
+    for pk, changed_fields in changed.items():
+        if pk not in instances:
+            continue
+        for field in changed_fields:
+            translations_changed.send(
+                sender=model, instance=instances[pk], field=field,
+                languages=set([target_language]), created=False
+            )
+
+
+def import_batch(units, source_language, target_language, result,
+                 dry_run=False, force=False):
+    u"""
+    Merges the `target_language` text of `units` into the objects they
+    refer to.
+    """
+    # Grouping units by model, then by object
+    grouped = defaultdict(lambda: defaultdict(dict))
+    for unit in units:
+        try:
+            model, pk, field = parse_unit_id(unit.id)
+        except ValueError as e:
+            result.conflict(unit, unicode(e))
+            continue
+        grouped[model][pk][field.name] = unit
+
+    for model, objects in grouped.items():
+        using = router.db_for_write(model)
+        field_names = sorted(set(
+            name for units_by_field in objects.values()
+            for name in units_by_field
+        ))
+        fields = [model._meta.get_field(name) for name in field_names]
+        updates = defaultdict(dict)
+        # {pk: [field, ...]} and {(field name, language code): change}
+        changed = defaultdict(list)
+        coverage_changes = defaultdict(int)
+        with transaction.atomic(using=using):
+            queryset = model._default_manager.db_manager(using).all()
+            if not dry_run:
+                # A report-only run doesn't block concurrent editors
+                queryset = queryset.select_for_update()
+            rows = queryset.filter(pk__in=list(objects)).values_list(
+                u'pk', *[field.attname for field in fields]
+            )
+            stored = dict((row[0], row[1:]) for row in rows)
+            for pk, units_by_field in objects.items():
+                if pk not in stored:
+                    for unit in units_by_field.values():
+                        result.conflict(unit, u'The object no longer exists.')
+                    continue
+                for field, raw_value in zip(fields, stored[pk]):
+                    unit = units_by_field.get(field.name)
+                    if unit is None:
+                        continue
+                    value = field.to_python(raw_value)
+                    current_source = getattr(value, source_language, u'')
+                    current_target = getattr(value, target_language, u'')
+                    if current_target == unit.target:
+                        result.unchanged += 1
+                        continue
+                    if not force:
+                        if unit.source != current_source:
+                            result.conflict(
+                                unit,
+                                u'The source text changed since it was exported.'
+                            )
+                            continue
+                        if current_target:
+                            result.conflict(
+                                unit,
+                                u'The object already has a different translation.'
+                            )
+                            continue
+                    setattr(value, target_language, unit.target)
+                    updates[field][pk] = field.get_prep_value(value)
+                    if field.companion_field is not None and (
+                            field.companion_language == target_language):
+                        updates[field.companion_field][pk] = (
+                            field.companion_text(unit.target)
+                        )
+                    changed[pk].append(field)
+                    coverage_changes[(field.name, target_language)] += (
+                        int(bool(unit.target)) - int(bool(current_target))
+                    )
+                    result.updated += 1
+            if not dry_run:
+                for field, values in updates.items():
+                    bulk_update_column(model, field, values, using)
+                coverage.record_translation_changes(model, coverage_changes)
+        if not dry_run and changed:
+            notify_import(model, changed, target_language, using)
+
+
+def import_translations(stream, format=u'xliff12', source_language=None,
+                        target_language=None, batch_size=DEFAULT_BATCH_SIZE,
+                        dry_run=False, force=False):
+    u"""
+    Reads the translation units in `stream` (a file opened in binary mode,
+    in `format`) and merges their `target_language` text into the objects
+    they refer to, `batch_size` units at a time. Returns an ImportResult.
+
+    `source_language` and `target_language` default to the languages the
+    file declares. Units whose source text changed since they were exported,
+    or whose objects already have a different translation, are reported as
+    conflicts and skipped unless `force` is True. Nothing is written when
+    `dry_run` is True.
+    """
+    reader = READERS[format](stream)
+    units = iter(reader)
+    result = ImportResult()
+    while True:
+        batch = list(islice(units, batch_size))
+        if not batch:
+            return result
+        source = source_language or reader.source_language
+        target = target_language or reader.target_language
+        if not source or not target:
+            raise ValueError(
+                u"The file doesn't declare its languages; pass "
+                u"source_language and target_language."
+            )
+        import_batch(batch, source, target, result, dry_run, force)
@@ -6,16 +6,120 @@ import os
 from django.conf import settings
 from django.core.exceptions import FieldError
 from django.core.files.storage import default_storage
+from django.db import models, router
 from django.db.models import SubfieldBase, Field
-from lxml import objectify, etree
+from django.db.models.signals import class_prepared, post_init, post_save
 
 from . import (
-    datastructures, forms, LANGUAGES,
+    conf, datastructures, forms, utils, LANGUAGES,
     INVALID_ARGUMENT_ERROR, XML_SYNTAX_ERROR
 )
+from .aio import run_in_executor
+from .signals import translations_changed
 
+# The instance attribute keeping the translations each field was loaded with
+LOADED_TRANSLATIONS_ATTRIBUTE = u'_multilingual_loaded_translations'
+# The instance attribute keeping the values set by
+# `MultilingualQuerySet.prefetch_translations` (with their language and the
+# translation they were prefetched with)
+PREFETCHED_TRANSLATIONS_ATTRIBUTE = u'_multilingual_prefetched_translations'
+COMPANION_NAME = u'{0}_{1}'
 
-class MultiLingualTextField(Field):
+
+def translations_of(value):
+    u"""
+    Returns a {language_code: translation (or file name)} dict with the
+    translations of `value` (a MultiLingualText or MultiLingualFile).
+    """
+    if isinstance(value, datastructures.MultiLingualFile):
+        return value.file_names()
+    if isinstance(value, datastructures.MultiLingualText):
+        return dict(
+            (code, getattr(value, code, u''))
+            for code in conf.settings.LANGUAGE_CODES
+        )
+    return {}
+
+
+def remembers_translations(model):
+    u"""
+    Returns True if the loaded translations of `model` instances have to be
+    remembered (when `translations_changed` has receivers for it or it
+    merges translations on save).
+    """
+    return translations_changed.has_listeners(model) or getattr(
+        model, u'merge_translations', False
+    )
+
+
+class TranslationsChangedMixin(object):
+    u"""
+    Sends `signals.translations_changed` when an instance is saved with
+    translations of this field that differ from the loaded ones.
+
+    The loaded translations are only remembered while the signal has
+    receivers for the model (or the model merges translations on save, see
+    `models.MultilingualFieldsMixin`): instances loaded before a receiver is
+    connected report every language as changed.
+    """
+
+    def contribute_to_class(self, cls, name):
+        super(TranslationsChangedMixin, self).contribute_to_class(cls, name)
+        self.connect_translation_signals(cls)
+        # Instances loaded with deferred fields (i.e. by `only()` or
+        # `prefetch_translations`) belong to classes of their own
+        class_prepared.connect(self.connect_deferred_class, weak=False)
+
+    def connect_translation_signals(self, cls):
+        post_init.connect(self.remember_translations, sender=cls, weak=False)
+        post_save.connect(
+            self.send_translations_changed, sender=cls, weak=False
+        )
+
+    def connect_deferred_class(self, sender, **kwargs):
+        if getattr(sender, u'_deferred', False) and (
+                sender._meta.concrete_model is self.model):
+            self.connect_translation_signals(sender)
+
+    def remember_translations(self, sender, instance, **kwargs):
+        sender = sender._meta.concrete_model
+        # Deferred fields aren't in the instance's __dict__
+        if self.attname not in instance.__dict__ or (
+                not remembers_translations(sender)):
+            return
+        instance.__dict__.setdefault(LOADED_TRANSLATIONS_ATTRIBUTE, {})[
+            self.attname
+        ] = translations_of(instance.__dict__[self.attname])
+
+    def send_translations_changed(self, sender, instance, created,
+                                  update_fields=None, **kwargs):
+        sender = sender._meta.concrete_model
+        if update_fields is not None and self.name not in update_fields:
+            return
+        if self.attname not in instance.__dict__ or (
+                not remembers_translations(sender)):
+            return
+        current = translations_of(
+            self.to_python(instance.__dict__[self.attname])
+        )
+        loaded = instance.__dict__.setdefault(LOADED_TRANSLATIONS_ATTRIBUTE, {})
+        previous = {} if created else loaded.get(self.attname)
+        loaded[self.attname] = current
+        if previous is None:
+            languages = set(conf.settings.LANGUAGE_CODES)
+        else:
+            languages = set(
+                code for code in set(previous) | set(current)
+                if (previous.get(code) or u'') != (current.get(code) or u'')
+            )
+        if languages and translations_changed.has_listeners(sender):
+            translations_changed.send(
+                sender=sender, instance=instance, field=self,
+                languages=languages, created=created
+            )
+
+
+class MultiLingualTextField(TranslationsChangedMixin, Field):
     u"""
     A django TextField for storing multiple manually-written translations
     of the same piece of text.
@@ -29,6 +133,17 @@ class MultiLingualTextField(Field):
 
     def __init__(self, *args, **kwargs):
         self.individual_widget_max_length = kwargs.get('max_length', None)
+        # When `compress` is True values longer than `compress_threshold`
+        # characters (MULTILINGUALFIELD_COMPRESS_THRESHOLD when None) are
+        # stored zlib-compressed (see utils.compress_xml)
+        self.compress = kwargs.pop('compress', False)
+        self.compress_threshold = kwargs.pop('compress_threshold', None)
+        # When `companion_language` is set (to a language code, or True for
+        # the first language in LANGUAGES) that translation is also kept in
+        # a plain `<name>_<code>` column (see `contribute_to_class`)
+        self.companion_language = kwargs.pop('companion_language', None)
+        self.companion_db_index = kwargs.pop('companion_db_index', False)
+        self.companion_field = None
         self._db_type = kwargs.get('db_type', 'text')
         if self._db_type not in ['text', 'mediumtext', 'longtext']:
             raise FieldError(
@@ -47,6 +162,99 @@ class MultiLingualTextField(Field):
             del kwargs[u'max_length']
         super(MultiLingualTextField, self).__init__(*args, **kwargs)
 
+    def contribute_to_class(self, cls, name):
+        super(MultiLingualTextField, self).contribute_to_class(cls, name)
+        if not self.companion_language or cls._meta.abstract:
+            return
+        if self.companion_language is True:
+            self.companion_language = conf.settings.LANGUAGE_CODES[0]
+        companion_name = COMPANION_NAME.format(
+            name, self.companion_language.replace(u'-', u'_')
+        )
+        if companion_name in [f.name for f in cls._meta.local_fields]:
+            return
+        options = {
+            u'editable': False,
+            u'blank': True,
+            u'default': u'',
+            u'db_index': self.companion_db_index,
+        }
+        if self.individual_widget_max_length:
+            companion = models.CharField(
+                max_length=self.individual_widget_max_length, **options
+            )
+        else:
+            companion = models.TextField(**options)
+        companion.multilingual_source = self
+        cls.add_to_class(companion_name, companion)
+        self.companion_field = companion
+
+    def companion_value(self, value):
+        u"""
+        Returns the companion column value for `value` (a MultiLingualText
+        or the XML stored in the database).
+        """
+        return self.companion_text(
+            getattr(self.to_python(value), self.companion_language, u'')
+        )
+
+    def companion_text(self, translation):
+        u"""Returns the companion column value for `translation`."""
+        translation = translation or u''
+        if self.individual_widget_max_length:
+            translation = translation[:self.individual_widget_max_length]
+        return translation
+
+    def pre_save(self, model_instance, add):
+        value = super(MultiLingualTextField, self).pre_save(model_instance, add)
+        value = self.complete_prefetched(model_instance, value)
+        if self.companion_field is not None:
+            setattr(
+                model_instance, self.companion_field.attname,
+                self.companion_value(value)
+            )
+        return value
+
+    def complete_prefetched(self, model_instance, value):
+        u"""
+        Returns `value` with the translations missing from it read from the
+        database when it is a value set by `prefetch_translations` (which
+        only holds one): its prefetched language and whatever other
+        translation was set on it replace the stored ones.
+
+        The stored translations (with the prefetched one as it was
+        prefetched) become the loaded ones `translations_changed` and
+        `MultilingualFieldsMixin.merge_translations_into` compare with. Rows
+        of models that merge translations are locked (so call this within
+        a transaction).
+        """
+        prefetched = model_instance.__dict__.get(
+            PREFETCHED_TRANSLATIONS_ATTRIBUTE, {}
+        ).pop(self.attname, None)
+        if prefetched is None or prefetched[0] is not value:
+            return value
+        value, language_code, prefetched_text = prefetched
+        model = model_instance.__class__._meta.concrete_model
+        queryset = model._base_manager.using(model_instance._state.db)
+        if getattr(model, u'merge_translations', False):
+            queryset = queryset.select_for_update()
+        stored = list(queryset.filter(pk=model_instance.pk).values_list(
+            self.attname, flat=True
+        ))
+        complete = self.to_python(stored[0] if stored else None)
+        if remembers_translations(model):
+            loaded = translations_of(complete)
+            loaded[language_code] = prefetched_text
+            model_instance.__dict__.setdefault(
+                LOADED_TRANSLATIONS_ATTRIBUTE, {}
+            )[self.attname] = loaded
+        for code, verbose in LANGUAGES:
+            text = getattr(value, code, u'')
+            if text or code == language_code:
+                setattr(complete, code, text)
+        setattr(model_instance, self.attname, complete)
+        return complete
+
     def get_internal_type(self):
         return 'TextField'
 
@@ -61,8 +269,8 @@ class MultiLingualTextField(Field):
 
     def to_python(self, value):
         u"""
-        Takes XML data from the database and converts it into an instance
-        of MultiLingualText.
+        Takes XML data from the database (or a {language_code: text} dict,
+        as deserialized) and converts it into an instance of MultiLingualText.
         """
         # Obviously MultiLingualText instances aren't stored in the database
         # but this conditional is there 'just-in-case' since a seralizer might
@@ -70,7 +278,12 @@ class MultiLingualTextField(Field):
         # stored in the database to create a MultiLingualText instance
         if isinstance(value, datastructures.MultiLingualText):
             return value
-        return datastructures.MultiLingualText(xml=value)
+        if isinstance(value, dict):
+            text = datastructures.MultiLingualText()
+            for code, verbose in LANGUAGES:
+                setattr(text, code, value.get(code) or u'')
+            return text
+        return datastructures.MultiLingualText(xml=utils.decompress_xml(value))
 
     def get_prep_value(self, value):
         u"""
@@ -91,8 +304,10 @@ class MultiLingualTextField(Field):
             xml = value.as_xml()
         else:
             # Otherwise check to see if it is a valid block of XML
+            from lxml import etree
+            value = utils.decompress_xml(value)
             try:
-                objectify.fromstring(value)
+                utils.validate_xml(value)
             except etree.XMLSyntaxError:
                 # If not, raise an Exception
                 raise Exception(XML_SYNTAX_ERROR + """<languages>
@@ -107,8 +322,42 @@ class MultiLingualTextField(Field):
             else:
                 # Otherwise set `xml` to `value`
                 xml = value
+        if self.compress:
+            threshold = self.compress_threshold
+            if threshold is None:
+                threshold = conf.settings.COMPRESS_THRESHOLD
+            xml = utils.compress_xml(xml, threshold)
         return xml
 
+    def save_form_data(self, instance, data):
+        u"""
+        Translations missing from `data` (those of languages a lazily-loaded
+        widget never rendered) keep their current values.
+        """
+        codes = [code for code, verbose in LANGUAGES]
+        if isinstance(data, datastructures.MultiLingualText):
+            # As returned by the form field, without the languages it left out
+            submitted = dict(
+                (code, data.__dict__[code]) for code in codes
+                if code in data.__dict__
+            )
+        elif isinstance(data, basestring) and data:
+            submitted = utils.extract_languages(data, codes) or None
+        else:
+            submitted = None
+        if submitted is not None and len(submitted) < len(codes):
+            current = getattr(instance, self.attname, None)
+            data = datastructures.MultiLingualText()
+            for code in codes:
+                setattr(data, code, submitted[code] if code in submitted
+                        else getattr(current, code, u''))
+        super(MultiLingualTextField, self).save_form_data(instance, data)
+
+    def value_to_string(self, obj):
+        u"""Serializes every language of the value (as XML)."""
+        value = self._get_val_from_obj(obj)
+        return value.as_xml() if value is not None else u''
+
     def formfield(self, **kwargs):
         # This is a fairly standard way to set up some defaults while letting
         # the caller override them.
@@ -136,7 +385,7 @@ class MultiLingualCharField(MultiLingualTextField):
         return super(MultiLingualCharField, self).formfield(**defaults)
 
 
-class MultiLingualFileField(Field):
+class MultiLingualFileField(TranslationsChangedMixin, Field):
     u"""
     A django FileField for storing multiple files (by language)
     in a single field.
@@ -165,10 +414,45 @@ class MultiLingualFileField(Field):
 
         self.storage = storage or default_storage
         self.upload_to = upload_to
+        # {rendition name: options} generated for every language's image
+        # (see `multilingualfield.renditions`)
+        self.renditions = kwargs.pop(u'renditions', None) or {}
         if callable(upload_to):
             self.generate_filename = upload_to
         super(MultiLingualFileField, self).__init__(verbose_name, name, **kwargs)
 
+    def contribute_to_class(self, cls, name):
+        super(MultiLingualFileField, self).contribute_to_class(cls, name)
+        if self.renditions:
+            post_save.connect(self.queue_renditions, sender=cls, weak=False)
+
+    def pre_save(self, model_instance, add):
+        u"""
+        Keeps the renditions recorded (by `multilingualfield.renditions`)
+        since `model_instance` was loaded for the files it still has, so
+        saving it doesn't drop them and queue them again.
+        """
+        value = super(MultiLingualFileField, self).pre_save(model_instance, add)
+        if (self.renditions and not add and model_instance.pk is not None
+                and isinstance(value, datastructures.MultiLingualFile)):
+            model = model_instance.__class__._meta.concrete_model
+            using = router.db_for_write(model, instance=model_instance)
+            # Locked until the save commits, so no job records renditions
+            # in between (see `renditions.record_renditions`)
+            rows = list(
+                model._base_manager.db_manager(using).select_for_update()
+                .filter(pk=model_instance.pk)
+                .values_list(self.attname, flat=True)
+            )
+            if rows:
+                value.keep_renditions(self.to_python(rows[0]))
+        return value
+
+    def queue_renditions(self, sender, instance, raw=False, **kwargs):
+        from .renditions import queue_missing_renditions
+        if not raw:
+            queue_missing_renditions(self, instance)
+
     def db_type(self, connection):
         return u'text'
 
@@ -179,26 +463,21 @@ class MultiLingualFileField(Field):
         """
         if isinstance(value, datastructures.MultiLingualFile):
             return value
-        elif isinstance(value, list):
+        if isinstance(value, dict):
+            # {language_code: file name}, as deserialized
+            value = [value.get(code) or u'' for code, verbose in LANGUAGES]
+        if isinstance(value, list):
+            from lxml import etree
             languages = [code for code, verbose in LANGUAGES]
             xml_block = etree.Element(u'languages')
             for index, this_file in enumerate(value):
+                if this_file is forms.NOT_LOADED:
+                    continue
                 language = etree.Element(u'language', code=languages[index])
                 # If `this_file` exists and is a 'File'
                 if this_file and (type(this_file) in forms.FILE_FIELD_CLASSES):
-                    # Figure out 'intended' file name and path
-                    file_name_and_path = os.path.join(
-                        self.upload_to,
-                        this_file.name
-                    )
-                    # Create file using this field's storage (as provided by
-                    # the parent fields 'formfield' method)
-                    created_file_name = self.storage.save(
-                        file_name_and_path,
-                        this_file
-                    )
                     # Finally, assign the created file name to the XML block
-                    language.text = created_file_name
+                    language.text = self.save_file(this_file)
                 # Otherwise...
                 else:
                     # ...if it's a bool it means the field is being cleared,
@@ -210,6 +489,25 @@ class MultiLingualFileField(Field):
             xml = value
         return datastructures.MultiLingualFile(xml=xml, storage=self.storage)
 
+    def save_file(self, this_file):
+        u"""
+        Saves `this_file` (an uploaded 'File') to this field's storage within
+        `upload_to` and returns the name it was saved under.
+        """
+        # Figure out 'intended' file name and path
+        file_name_and_path = os.path.join(self.upload_to, this_file.name)
+        # Create file using this field's storage (as provided by the parent
+        # fields 'formfield' method)
+        return self.storage.save(file_name_and_path, this_file)
+
+    def asave_file(self, this_file):
+        u"""
+        Version of `save_file` that writes the upload to storage on the
+        bounded thread pool in `multilingualfield.aio` and returns a
+        `concurrent.futures.Future` (whose result is the stored name).
+        """
+        return run_in_executor(self.save_file, this_file)
+
     def get_prep_value(self, value):
         u"""
         Converts an instance of MultiLingualFile into what will ultimately be
@@ -227,6 +525,31 @@ class MultiLingualFileField(Field):
         return value.as_xml() if isinstance(
             value, datastructures.MultiLingualFile) else value
 
+    def save_form_data(self, instance, data):
+        u"""
+        The languages a lazily-loaded widget never rendered keep their
+        current files, and unchanged files their renditions.
+        """
+        current = getattr(instance, self.attname, None)
+        if isinstance(data, list) and any(
+                this_file is forms.NOT_LOADED for this_file in data
+        ):
+            data = [
+                getattr(getattr(current, code, None), u'name', None) or u''
+                if this_file is forms.NOT_LOADED else this_file
+                for this_file, (code, verbose) in zip(data, LANGUAGES)
+            ]
+        super(MultiLingualFileField, self).save_form_data(instance, data)
+        value = getattr(instance, self.attname, None)
+        if isinstance(current, datastructures.MultiLingualFile) and (
+                isinstance(value, datastructures.MultiLingualFile)):
+            value.keep_renditions(current)
+
+    def value_to_string(self, obj):
+        u"""Serializes every language of the value (as XML)."""
+        value = self._get_val_from_obj(obj)
+        return value.as_xml() if value is not None else u''
+
     def formfield(self, **kwargs):
         # This is a fairly standard way to set up some defaults while letting
         # the caller override them.
@@ -246,12 +569,18 @@ if u'south' in settings.INSTALLED_APPS:
             "^multilingualfield\.fields\.MultiLingualFileField",
         ]
     )
+    # `companion_language` is left out: frozen models already include the
+    # companion columns as fields of their own
     multilingualtextfield_rules = [
         (
             (MultiLingualTextField,),
             [],
             {
-                'db_type': ['_db_type', {'default': 'text'}]
+                'db_type': ['_db_type', {'default': 'text'}],
+                'compress': ['compress', {'default': False}],
+                'compress_threshold': [
+                    'compress_threshold', {'default': None}
+                ],
             }
         )
     ]
@@ -8,13 +8,16 @@ from django.core.files.uploadedfile import (
 )
 from django.forms import CharField, MultiValueField, ValidationError, FileField
 from django.forms.widgets import FILE_INPUT_CONTRADICTION
-from lxml import etree
 
 from . import (
-    widgets, LANGUAGES, LANGUAGES_REPLACEMENT,
+    datastructures, widgets, LANGUAGES, LANGUAGES_REPLACEMENT,
     LANGUAGES_REQUIRED_TEXT, REQUIRED_ERROR
 )
 
+# Stands for the files of languages whose inputs were never loaded (see
+# widgets.MultiLingualFieldBaseMixInWidget.load_url)
+NOT_LOADED = object()
+
 # This list is used to validate file uploads
 FILE_FIELD_CLASSES = File.__subclasses__() + [
     TemporaryUploadedFile,
@@ -25,6 +28,8 @@ FILE_FIELD_CLASSES = File.__subclasses__() + [
 class MultiLingualTextField(MultiValueField):
     u"""The field used by MultiLingualTextField."""
     widget = widgets.MultiLingualTextFieldWidget
+    # The indexes of the languages the widget didn't load (see `clean`)
+    not_loaded = ()
 
     def widget_attrs(self, widget):
         u"""
@@ -63,32 +68,62 @@ class MultiLingualTextField(MultiValueField):
             tuple(fields), *args, **kwargs
         )
 
+    def clean(self, value):
+        u"""
+        Cleans every loaded language with its sub-field (MultiValueField's
+        `clean` would also clean, and require, the languages the widget
+        didn't load) and compresses the result.
+        """
+        self.not_loaded = getattr(value, u'not_loaded', ())
+        if value and not isinstance(value, (list, tuple)):
+            raise ValidationError(self.error_messages[u'invalid'])
+        if not value or not [v for v in value if v not in self.empty_values]:
+            return self.compress([])
+        clean_data = []
+        errors = []
+        for index, field in enumerate(self.fields):
+            if index in self.not_loaded:
+                clean_data.append(u'')
+                continue
+            try:
+                clean_data.append(field.clean(
+                    value[index] if index < len(value) else None
+                ))
+            except ValidationError as e:
+                errors.extend(e.error_list)
+        if errors:
+            raise ValidationError(errors)
+        out = self.compress(clean_data)
+        self.validate(out)
+        self.run_validators(out)
+        return out
+
     def compress(self, data_list):
         u"""
-        Compresses a list of text into XML in the following structure:
-        <languages>
-            <language code="en">
-                Hello
-            </language>
-            <language code="es">
-                Hola
-            </language>
-        </languages>
+        Compresses a list of text into a MultiLingualText (which the model
+        field and the widget use as is, without encoding it as XML).
+
+        Languages the widget didn't load are left out (the model field keeps
+        their current translations, see `MultiLingualTextField.save_form_data`).
         """
-        xml = etree.Element(u'languages')
+        if not data_list and self.not_loaded:
+            data_list = [u''] * len(LANGUAGES)
         if self.mandatory_field and not data_list:
             raise ValidationError(
                 REQUIRED_ERROR.format(LANGUAGES_REQUIRED_TEXT)
             )
-        elif data_list:
-            for index, entry in enumerate(data_list):
-                code, verbose = LANGUAGES[index]
-                language = etree.Element(u'language', code=code)
-                if code not in LANGUAGES_REPLACEMENT and not entry and self.mandatory_field:
-                    raise ValidationError(REQUIRED_ERROR.format(verbose))
-                language.text = entry
-                xml.append(language)
-        return etree.tostring(xml)
+        elif not data_list:
+            return datastructures.MultiLingualText()
+        value = datastructures.MultiLingualText()
+        for index, entry in enumerate(data_list):
+            code, verbose = LANGUAGES[index]
+            if index in self.not_loaded:
+                delattr(value, code)
+                continue
+            if code not in LANGUAGES_REPLACEMENT and not entry and self.mandatory_field:
+                raise ValidationError(REQUIRED_ERROR.format(verbose))
+            setattr(value, code, entry or u'')
+        return value
 
 
 class MultiLingualCharField(MultiLingualTextField):
@@ -138,6 +173,8 @@ class FileOrAlreadyExistantFilePathField(FileField):
 class MultiLingualFileField(MultiValueField):
     u"""The field used by MultiLingualFileField."""
     widget = widgets.MultiLingualClearableFileInputWidget
+    # The indexes of the languages the widget didn't load (see `clean`)
+    not_loaded = ()
 
     def widget_attrs(self, widget):
         u"""
@@ -167,6 +204,35 @@ class MultiLingualFileField(MultiValueField):
             tuple(fields), *args, **kwargs
         )
 
+    def clean(self, value):
+        u"""
+        Cleans every loaded language with its sub-field (see
+        `MultiLingualTextField.clean`) and compresses the result.
+        """
+        self.not_loaded = getattr(value, u'not_loaded', ())
+        if value and not isinstance(value, (list, tuple)):
+            raise ValidationError(self.error_messages[u'invalid'])
+        if not value or not [v for v in value if v not in self.empty_values]:
+            return self.compress([])
+        clean_data = []
+        errors = []
+        for index, field in enumerate(self.fields):
+            if index in self.not_loaded:
+                clean_data.append(None)
+                continue
+            try:
+                clean_data.append(field.clean(
+                    value[index] if index < len(value) else None
+                ))
+            except ValidationError as e:
+                errors.extend(e.error_list)
+        if errors:
+            raise ValidationError(errors)
+        out = self.compress(clean_data)
+        self.validate(out)
+        self.run_validators(out)
+        return out
+
     def compress(self, data_list):
         u"""
         Compresses a list of text into XML in the following structure:
@@ -181,12 +247,20 @@ class MultiLingualFileField(MultiValueField):
         """
         #languages = [code for code, verbose in LANGUAGES]
         #xml = etree.Element(u'languages')
+        if not data_list and self.not_loaded:
+            data_list = [None] * len(LANGUAGES)
         if self.mandatory_field and not data_list:
             raise ValidationError(
                 REQUIRED_ERROR.format(LANGUAGES_REQUIRED_TEXT)
             )
         elif data_list:
+            data_list = list(data_list)
             for index, this_file in enumerate(data_list):
+                if index in self.not_loaded:
+                    # Keeps the current file (see
+                    # `MultiLingualFileField.save_form_data`)
+                    data_list[index] = NOT_LOADED
+                    continue
                 code, verbose = LANGUAGES[index]
                 if (code not in LANGUAGES_REPLACEMENT and self.mandatory_field
                     and not this_file and not type(this_file) in FILE_FIELD_CLASSES):
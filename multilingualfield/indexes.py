@@ -0,0 +1,159 @@
+u"""
+Per-language indexes on multilingual values.
+
+Filtering or sorting by one language of a field (see
+`sql.translation_sql`) has to extract that translation from every row
+unless the database keeps an index on the extracted value. Models using
+`MultilingualFieldsMixin` declare the translations to index with::
+
+    class Article(MultilingualFieldsMixin, models.Model):
+        multilingual_indexes = [(u'title', [u'en', u'es'])]
+
+and the `multilingual_indexes` management command creates (or drops) them
+as expression indexes. Only PostgreSQL is supported: it inlines query
+parameters before planning, so the expressions `sql.translation_sql` builds
+(i.e. in the admin and `prefetch_translations`) match the indexed ones.
+SQLite binds them instead and never uses such indexes, and MySQL can only
+index a generated column those queries don't reference. Only fields of
+uncompressed values can be indexed.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.util import truncate_name
+from django.db.models.fields import FieldDoesNotExist
+
+from . import conf, fields
+from .sql import translation_sql
+
+INDEX_NAME = u'{0}_{1}_{2}_translation'
+UNSUPPORTED_DATABASE_ERROR = (
+    u'Per-language indexes are only supported on PostgreSQL (the database '
+    u'is {0}).'
+)
+INVALID_INDEX_FIELD_ERROR = (
+    u'{0}.multilingual_indexes: `{1}` must be a MultiLingualTextField '
+    u'without compress=True.'
+)
+INVALID_INDEX_LANGUAGE_ERROR = (
+    u'{0}.multilingual_indexes: `{1}` is not in LANGUAGES.'
+)
+
+
+def literal_sql(sql, params):
+    u"""Returns `sql` with `params` (strings) inlined as SQL literals."""
+    return sql % tuple(
+        u"'{0}'".format(param.replace(u"'", u"''")) for param in params
+    )
+
+
+def declared_indexes(model):
+    u"""
+    Returns a [(field, language_code), ...] list with the translations
+    `model.multilingual_indexes` declares.
+    """
+    codes = conf.settings.LANGUAGE_CODES
+    result = []
+    for field_name, language_codes in getattr(
+            model, u'multilingual_indexes', ()):
+        try:
+            field = model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            field = None
+        if not isinstance(field, fields.MultiLingualTextField) or field.compress:
+            raise ImproperlyConfigured(
+                INVALID_INDEX_FIELD_ERROR.format(model.__name__, field_name)
+            )
+        for code in language_codes:
+            if code not in codes:
+                raise ImproperlyConfigured(
+                    INVALID_INDEX_LANGUAGE_ERROR.format(model.__name__, code)
+                )
+            result.append((field, code))
+    return result
+
+
+def index_name(connection, model, field, language_code):
+    u"""
+    Returns the name of the index of the `language_code` translation of
+    `field`.
+    """
+    return truncate_name(
+        INDEX_NAME.format(model._meta.db_table, field.column, language_code),
+        connection.ops.max_name_length()
+    )
+
+
+def translation_expression(connection, field, language_code):
+    u"""
+    Returns the SQL extracting the `language_code` translation of `field`,
+    with its parameters inlined (as indexes require).
+    """
+    return literal_sql(*translation_sql(
+        connection, connection.ops.quote_name(field.column), language_code
+    ))
+
+
+def create_index_sql(connection, model, field, language_code):
+    u"""
+    Returns the statements creating the index of the `language_code`
+    translation of `field`.
+    """
+    qn = connection.ops.quote_name
+    return [u'CREATE INDEX {0} ON {1} (({2}))'.format(
+        qn(index_name(connection, model, field, language_code)),
+        qn(model._meta.db_table),
+        translation_expression(connection, field, language_code)
+    )]
+
+
+def drop_index_sql(connection, model, field, language_code):
+    u"""
+    Returns the statements dropping the index of the `language_code`
+    translation of `field`.
+    """
+    return [u'DROP INDEX {0}'.format(connection.ops.quote_name(
+        index_name(connection, model, field, language_code)
+    ))]
+
+
+def index_exists(connection, model, field, language_code):
+    u"""
+    Returns True if the index of the `language_code` translation of `field`
+    exists (checked in the catalog, as `CREATE INDEX IF NOT EXISTS` needs
+    PostgreSQL 9.5).
+    """
+    cursor = connection.cursor()
+    cursor.execute(
+        u"SELECT 1 FROM pg_class WHERE relname = %s AND relkind = 'i' "
+        u"AND pg_table_is_visible(oid)",
+        [index_name(connection, model, field, language_code)]
+    )
+    return cursor.fetchone() is not None
+
+
+def sync_indexes(connection, model, drop=False, execute=True):
+    u"""
+    Creates (or, when `drop` is True, drops) the indexes `model` declares
+    and returns the statements run (or that would be run when `execute`
+    is False). Raises ImproperlyConfigured on databases other than
+    PostgreSQL.
+    """
+    if connection.vendor != u'postgresql':
+        raise ImproperlyConfigured(
+            UNSUPPORTED_DATABASE_ERROR.format(connection.vendor)
+        )
+    statements = []
+    for field, code in declared_indexes(model):
+        exists = index_exists(connection, model, field, code)
+        if drop and exists:
+            statements.extend(drop_index_sql(connection, model, field, code))
+        elif not drop and not exists:
+            statements.extend(create_index_sql(connection, model, field, code))
+    if execute and statements:
+        cursor = connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+    return statements
@@ -0,0 +1,114 @@
+u"""
+Optional instrumentation for multilingual fields.
+
+Set `MULTILINGUALFIELD_INSTRUMENTATION = True` in your settings file to
+count (and time) how often multilingual values are decoded from XML,
+encoded to XML, validated and how often a language lookup falls back to
+another language (or fails). The setting is read on every call (so
+`override_settings` can toggle it); when it is disabled the hot paths only
+pay for that check.
+
+Counters are kept per thread and are reset at the start of every request by
+`InstrumentationMiddleware` (or by the django-debug-toolbar panel in
+`multilingualfield.panels`). Every event is also broadcast through the
+`multilingualfield.signals.instrumentation_event` signal.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import threading
+from collections import defaultdict
+from functools import wraps
+from timeit import default_timer
+
+from . import conf
+from .signals import instrumentation_event
+
+DECODE = u'decode'
+ENCODE = u'encode'
+VALIDATION = u'validation'
+FALLBACK = u'fallback'
+EVENTS = (DECODE, ENCODE, VALIDATION, FALLBACK)
+
+_local = threading.local()
+
+
+def is_enabled():
+    u"""Tells whether `MULTILINGUALFIELD_INSTRUMENTATION` is set."""
+    return bool(conf.settings.INSTRUMENTATION)
+
+
+class Stats(object):
+    u"""Event counts and cumulative timings (in seconds) for one thread."""
+
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.timings = defaultdict(float)
+
+    def as_dict(self):
+        return dict(
+            (event, {
+                u'count': self.counts[event],
+                u'time': self.timings[event]
+            })
+            for event in EVENTS
+        )
+
+
+def get_stats():
+    u"""Returns the `Stats` instance for the current thread."""
+    try:
+        return _local.stats
+    except AttributeError:
+        _local.stats = Stats()
+        return _local.stats
+
+
+def reset():
+    u"""Starts a fresh `Stats` instance for the current thread."""
+    _local.stats = Stats()
+
+
+def record(event, duration=None, detail=None):
+    u"""Counts (and, if `duration` is provided, times) `event`."""
+    stats = get_stats()
+    stats.counts[event] += 1
+    if duration is not None:
+        stats.timings[event] += duration
+    instrumentation_event.send(
+        sender=None,
+        event=event,
+        duration=duration,
+        detail=detail
+    )
+
+
+def instrumented(event):
+    u"""
+    Decorator that records `event` (along with how long the decorated
+    function took) every time the decorated function is called while
+    instrumentation is enabled.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not conf.settings.INSTRUMENTATION:
+                return func(*args, **kwargs)
+            start = default_timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(event, default_timer() - start, func.__name__)
+        return wrapper
+    return decorator
+
+
+class InstrumentationMiddleware(object):
+    u"""
+    Resets the instrumentation counters at the start of every request so
+    `get_stats()` always describes the request being processed.
+    """
+
+    def process_request(self, request):
+        reset()
@@ -0,0 +1,107 @@
+u"""
+Sharing of repeated translations between decoded values.
+
+Catalog-like data repeats a lot (category names, disclaimers, empty
+translations...) and every decoded `MultiLingualText` normally holds its
+own copy of each string. An intern pool makes identical translations
+decoded while it is active share a single string object.
+
+Pools hold at most `max_size` strings, evicting the least recently used
+one when full. Enable one for every decode by setting
+`MULTILINGUALFIELD_INTERN_POOL_SIZE`, or just for a bulk load::
+
+    with intern_translations():
+        products = list(Product.objects.all())
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from . import conf
+
+DEFAULT_POOL_SIZE = 10000
+
+
+class InternPool(object):
+    u"""A bounded, least-recently-used pool of shared strings."""
+
+    def __init__(self, max_size=DEFAULT_POOL_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._strings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._strings)
+
+    def intern(self, text):
+        u"""
+        Returns the pooled string equal to `text` (pooling `text` itself if
+        there's none).
+        """
+        if not text:
+            return u''
+        strings = self._strings
+        with self._lock:
+            shared = strings.get(text)
+            if shared is None:
+                self.misses += 1
+                if len(strings) >= self.max_size:
+                    strings.popitem(last=False)
+                strings[text] = shared = text
+            else:
+                self.hits += 1
+                # Marking `shared` as the most recently used
+                if hasattr(strings, u'move_to_end'):
+                    strings.move_to_end(shared)
+                else:  # Python 2
+                    del strings[shared]
+                    strings[shared] = shared
+        return shared
+
+    def clear(self):
+        with self._lock:
+            self._strings.clear()
+            self.hits = self.misses = 0
+
+
+class _LocalPool(threading.local):
+    pool = None
+
+_local = _LocalPool()
+_shared_pool = None
+
+
+def get_pool():
+    u"""
+    Returns the pool decoding should use: the one of the innermost active
+    `intern_translations` block or, when `MULTILINGUALFIELD_INTERN_POOL_SIZE`
+    is set, the process-wide one (None otherwise).
+    """
+    global _shared_pool
+    if _local.pool is not None:
+        return _local.pool
+    size = conf.settings.INTERN_POOL_SIZE
+    if not size:
+        return None
+    if _shared_pool is None or _shared_pool.max_size != size:
+        _shared_pool = InternPool(size)
+    return _shared_pool
+
+
+@contextmanager
+def intern_translations(max_size=DEFAULT_POOL_SIZE):
+    u"""
+    Shares identical translations decoded (by the current thread) within
+    the block. Yields the InternPool used.
+    """
+    previous, _local.pool = _local.pool, InternPool(max_size)
+    try:
+        yield _local.pool
+    finally:
+        _local.pool = previous
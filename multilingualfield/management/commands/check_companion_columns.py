@@ -0,0 +1,85 @@
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import get_model, get_models
+
+from ...exchange import DEFAULT_CHUNK_SIZE, bulk_update_column, iter_chunks
+
+
+def companion_fields(model):
+    return [
+        field for field in model._meta.fields
+        if getattr(field, u'companion_field', None) is not None
+    ]
+
+
+class Command(BaseCommand):
+    args = u'[app_label.ModelName ...]'
+    help = (
+        u'Reports (and, with --fix, corrects) the companion columns that '
+        u'differ from the translation they keep, for the given models '
+        u'(defaults to every model with companion columns).'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            u'--fix', action=u'store_true', default=False,
+            help=u'Rewrite the companion columns that differ.'
+        ),
+        make_option(
+            u'--chunk-size', type=u'int', default=DEFAULT_CHUNK_SIZE,
+            dest=u'chunk_size', help=u'Rows read per query.'
+        ),
+        make_option(
+            u'--database', default=DEFAULT_DB_ALIAS,
+            help=u'The database to check.'
+        ),
+    )
+
+    def handle(self, *labels, **options):
+        if labels:
+            models = []
+            for label in labels:
+                try:
+                    app_label, model_name = label.split(u'.')
+                except ValueError:
+                    raise CommandError(
+                        u"Models must be given as 'app_label.ModelName'."
+                    )
+                model = get_model(app_label, model_name)
+                if model is None or not companion_fields(model):
+                    raise CommandError(
+                        u"'{0}' isn't a model with companion columns."
+                        .format(label)
+                    )
+                models.append(model)
+        else:
+            models = [model for model in get_models() if companion_fields(model)]
+
+        using = options[u'database']
+        for model in models:
+            for field in companion_fields(model):
+                companion = field.companion_field
+                mismatches = 0
+                queryset = model._default_manager.using(using)
+                for rows in iter_chunks(
+                        queryset, [field, companion], options[u'chunk_size']):
+                    values = {}
+                    for pk, raw_value, stored in rows:
+                        expected = field.companion_value(raw_value)
+                        if expected != (stored or u''):
+                            values[pk] = expected
+                    mismatches += len(values)
+                    if values and options[u'fix']:
+                        with transaction.atomic(using=using):
+                            bulk_update_column(model, companion, values, using)
+                self.stdout.write(
+                    u'{0}.{1}: {2} {3}'.format(
+                        model._meta.object_name, companion.name, mismatches,
+                        u'fixed' if options[u'fix'] else u'inconsistent'
+                    )
+                )
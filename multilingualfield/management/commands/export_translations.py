@@ -0,0 +1,83 @@
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import sys
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import get_model
+
+from ...exchange import DEFAULT_CHUNK_SIZE, FORMATS, export_translations
+
+
+class Command(BaseCommand):
+    args = u'app_label.ModelName'
+    help = (
+        u'Exports the source and target language translations of the '
+        u'multilingual fields of a model as XLIFF, CSV or PO.'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            u'--source', help=u'The language translators translate from.'
+        ),
+        make_option(
+            u'--target', help=u'The language translators translate into.'
+        ),
+        make_option(
+            u'--fields',
+            help=u'Comma-separated field names (defaults to every '
+                 u'multilingual text field).'
+        ),
+        make_option(
+            u'--format', choices=FORMATS, default=u'xliff12',
+            help=u'One of: {0} (default: xliff12).'.format(u', '.join(FORMATS))
+        ),
+        make_option(
+            u'--output', help=u'Write to this file instead of stdout.'
+        ),
+        make_option(
+            u'--chunk-size', type=u'int', default=DEFAULT_CHUNK_SIZE,
+            dest=u'chunk_size', help=u'Rows read per query.'
+        ),
+        make_option(
+            u'--untranslated', action=u'store_true', default=False,
+            help=u'Only export units without a target language translation.'
+        ),
+    )
+
+    def handle(self, *labels, **options):
+        from ...fields import MultiLingualTextField
+        if len(labels) != 1 or labels[0].count(u'.') != 1:
+            raise CommandError(u"Pass a single 'app_label.ModelName'.")
+        model = get_model(*labels[0].split(u'.'))
+        if model is None:
+            raise CommandError(u"Unknown model '{0}'.".format(labels[0]))
+        if not options[u'source'] or not options[u'target']:
+            raise CommandError(u'Both --source and --target are required.')
+        if options[u'fields']:
+            field_names = options[u'fields'].split(u',')
+        else:
+            field_names = [
+                f.name for f in model._meta.fields
+                if isinstance(f, MultiLingualTextField)
+            ]
+
+        stream = open(options[u'output'], u'wb') if options[u'output'] \
+            else getattr(sys.stdout, u'buffer', sys.stdout)
+        try:
+            count = export_translations(
+                model._default_manager.all(),
+                field_names,
+                options[u'source'],
+                options[u'target'],
+                stream,
+                format=options[u'format'],
+                chunk_size=options[u'chunk_size'],
+                skip_translated=options[u'untranslated']
+            )
+        finally:
+            if options[u'output']:
+                stream.close()
+        if options[u'output'] and int(options[u'verbosity']) > 0:
+            self.stdout.write(u'Exported {0} translation units.'.format(count))
@@ -0,0 +1,90 @@
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import os
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...exchange import DEFAULT_BATCH_SIZE, FORMATS, import_translations
+
+EXTENSIONS = {
+    u'.xlf': u'xliff12',
+    u'.xliff': u'xliff12',
+    u'.csv': u'csv',
+    u'.po': u'po',
+}
+
+
+class Command(BaseCommand):
+    args = u'path/to/translations.xlf'
+    help = (
+        u'Imports translations from an XLIFF, CSV or PO file (as written by '
+        u'export_translations) into the objects they belong to.'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            u'--format', choices=FORMATS,
+            help=u'One of: {0} (defaults to guessing from the extension).'
+            .format(u', '.join(FORMATS))
+        ),
+        make_option(
+            u'--source',
+            help=u'The source language (defaults to the one in the file).'
+        ),
+        make_option(
+            u'--target',
+            help=u'The target language (defaults to the one in the file).'
+        ),
+        make_option(
+            u'--batch-size', type=u'int', default=DEFAULT_BATCH_SIZE,
+            dest=u'batch_size',
+            help=u'Translation units written per transaction.'
+        ),
+        make_option(
+            u'--dry-run', action=u'store_true', default=False, dest=u'dry_run',
+            help=u"Report what would be imported (and any conflicts) "
+                 u"without writing anything."
+        ),
+        make_option(
+            u'--force', action=u'store_true', default=False,
+            help=u'Import conflicting translations too.'
+        ),
+    )
+
+    def handle(self, *paths, **options):
+        if len(paths) != 1:
+            raise CommandError(u'Pass the path of a single file to import.')
+        path = paths[0]
+        format = options[u'format'] or EXTENSIONS.get(
+            os.path.splitext(path)[1].lower()
+        )
+        if format is None:
+            raise CommandError(
+                u"Can't guess the format of '{0}'; pass --format.".format(path)
+            )
+        with open(path, u'rb') as stream:
+            try:
+                result = import_translations(
+                    stream,
+                    format=format,
+                    source_language=options[u'source'],
+                    target_language=options[u'target'],
+                    batch_size=options[u'batch_size'],
+                    dry_run=options[u'dry_run'],
+                    force=options[u'force']
+                )
+            except ValueError as e:
+                raise CommandError(unicode(e))
+        for unit_id, reason in result.conflicts:
+            self.stderr.write(u'{0}: {1}'.format(unit_id, reason))
+        self.stdout.write(
+            u'{0}{1} translations {2}, {3} unchanged, {4} conflicts.'.format(
+                u'(dry run) ' if options[u'dry_run'] else u'',
+                result.updated,
+                u'to import' if options[u'dry_run'] else u'imported',
+                result.unchanged,
+                len(result.conflicts)
+            )
+        )
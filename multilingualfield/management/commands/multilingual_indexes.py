@@ -0,0 +1,69 @@
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from optparse import make_option
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import get_model, get_models
+
+from ...indexes import sync_indexes
+
+
+class Command(BaseCommand):
+    args = u'[app_label.ModelName ...]'
+    help = (
+        u'Creates the per-language indexes declared by the '
+        u'`multilingual_indexes` of the given models (defaults to every '
+        u'model declaring some).'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            u'--drop', action=u'store_true', default=False,
+            help=u'Drop the indexes instead.'
+        ),
+        make_option(
+            u'--sql', action=u'store_true', default=False,
+            help=u'Only print the SQL statements.'
+        ),
+        make_option(
+            u'--database', default=DEFAULT_DB_ALIAS,
+            help=u'The database to create the indexes in.'
+        ),
+    )
+
+    def handle(self, *labels, **options):
+        if labels:
+            models = []
+            for label in labels:
+                try:
+                    app_label, model_name = label.split(u'.')
+                except ValueError:
+                    raise CommandError(
+                        u"Models must be given as 'app_label.ModelName'."
+                    )
+                model = get_model(app_label, model_name)
+                if model is None:
+                    raise CommandError(u"Unknown model '{0}'.".format(label))
+                models.append(model)
+        else:
+            models = [
+                model for model in get_models()
+                if getattr(model, u'multilingual_indexes', None)
+            ]
+        connection = connections[options[u'database']]
+        for model in models:
+            try:
+                statements = sync_indexes(
+                    connection, model, drop=options[u'drop'],
+                    execute=not options[u'sql']
+                )
+            except ImproperlyConfigured as e:
+                raise CommandError(unicode(e))
+            for statement in statements:
+                if options[u'sql']:
+                    self.stdout.write(statement + u';')
+                elif int(options.get(u'verbosity', 1)) > 1:
+                    self.stdout.write(statement)
@@ -0,0 +1,49 @@
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import get_model, get_models
+
+from ...coverage import model_label, rebuild_summary
+from ...models import MultilingualFieldsMixin
+
+
+class Command(BaseCommand):
+    args = u'[app_label.ModelName ...]'
+    help = (
+        u'Recomputes the translation coverage summary table for the given '
+        u'models (defaults to every model using MultilingualFieldsMixin).'
+    )
+
+    def handle(self, *labels, **options):
+        if labels:
+            models = []
+            for label in labels:
+                try:
+                    app_label, model_name = label.split(u'.')
+                except ValueError:
+                    raise CommandError(
+                        u"Models must be given as 'app_label.ModelName'."
+                    )
+                model = get_model(app_label, model_name)
+                if model is None or not issubclass(
+                        model, MultilingualFieldsMixin):
+                    raise CommandError(
+                        u"'{0}' isn't a model using MultilingualFieldsMixin."
+                        .format(label)
+                    )
+                models.append(model)
+        else:
+            models = [
+                model for model in get_models()
+                if issubclass(model, MultilingualFieldsMixin)
+            ]
+        for model in models:
+            rebuild_summary(model)
+            if int(options.get(u'verbosity', 1)) > 0:
+                self.stdout.write(
+                    u'Rebuilt translation coverage for {0}'.format(
+                        model_label(model)
+                    )
+                )
@@ -0,0 +1,102 @@
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import get_model
+
+from ...exchange import DEFAULT_CHUNK_SIZE
+from ...reencoding import MODES, reencode
+
+
+class Command(BaseCommand):
+    args = u'app_label.ModelName'
+    help = (
+        u'Re-encodes the stored values of the multilingual fields of a '
+        u'model: normalizes their language order and compresses or '
+        u'decompresses them.'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            u'--mode', choices=MODES, default=u'normalize',
+            help=u'One of: {0} (default: normalize).'.format(u', '.join(MODES))
+        ),
+        make_option(
+            u'--fields',
+            help=u'Comma-separated field names (defaults to every '
+                 u'multilingual field).'
+        ),
+        make_option(
+            u'--workers', type=u'int', default=None,
+            help=u'Worker processes (defaults to the number of CPUs, 0 '
+                 u'works in this process).'
+        ),
+        make_option(
+            u'--chunk-size', type=u'int', default=DEFAULT_CHUNK_SIZE,
+            dest=u'chunk_size', help=u'Rows read (and written) per query.'
+        ),
+        make_option(
+            u'--rows-per-second', type=u'float', default=None,
+            dest=u'rows_per_second', help=u'Throttle to this many rows.'
+        ),
+        make_option(
+            u'--checkpoint',
+            help=u'Keep progress in this file and resume from it.'
+        ),
+        make_option(
+            u'--database', default=DEFAULT_DB_ALIAS,
+            help=u'The database to re-encode.'
+        ),
+    )
+
+    def handle(self, *labels, **options):
+        from ...fields import MultiLingualFileField, MultiLingualTextField
+        if len(labels) != 1 or labels[0].count(u'.') != 1:
+            raise CommandError(u"Pass a single 'app_label.ModelName'.")
+        model = get_model(*labels[0].split(u'.'))
+        if model is None:
+            raise CommandError(u"Unknown model '{0}'.".format(labels[0]))
+        multilingual = [
+            field for field in model._meta.fields
+            if isinstance(field, (MultiLingualTextField, MultiLingualFileField))
+        ]
+        if options[u'fields']:
+            names = options[u'fields'].split(u',')
+            fields = [field for field in multilingual if field.name in names]
+            if len(fields) != len(names):
+                raise CommandError(
+                    u'Only multilingual fields can be re-encoded.'
+                )
+        else:
+            fields = multilingual
+        if not fields:
+            raise CommandError(u'The model has no multilingual fields.')
+
+        verbosity = int(options.get(u'verbosity', 1))
+        total = model._default_manager.using(options[u'database']).count()
+
+        def progress(checkpoint):
+            if verbosity > 0:
+                self.stdout.write(
+                    u'{0}/{1} rows read, {2} values re-encoded'.format(
+                        checkpoint.processed, total, checkpoint.changed
+                    )
+                )
+
+        try:
+            checkpoint = reencode(
+                model, fields, mode=options[u'mode'],
+                workers=options[u'workers'], chunk_size=options[u'chunk_size'],
+                rows_per_second=options[u'rows_per_second'],
+                checkpoint_path=options[u'checkpoint'], progress=progress,
+                using=options[u'database']
+            )
+        except ValueError as e:
+            raise CommandError(unicode(e))
+        if verbosity > 0:
+            self.stdout.write(u'Done: {0} values re-encoded.'.format(
+                checkpoint.changed
+            ))
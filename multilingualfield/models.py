@@ -2,24 +2,142 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 
-from . import fields, LANGUAGES
+from django.db import models, router, transaction
+from django.db.models.signals import class_prepared
+from django.utils.translation import ugettext_lazy as _
+
+from . import cache, conf, coverage, datastructures, fields, LANGUAGES
 
 
 ARGUMENT = u'{0}__regex'
 LANGUAGE_REGEX = u'.*<language code="{0}">[^<]+</language>.*'
+TRANSLATION_CONFLICT_ERROR = (
+    u'These translations were changed since the object was loaded: {0}.'
+)
+
+
+class TranslationConflict(Exception):
+    u"""
+    Raised by `MultilingualFieldsMixin.save` (when `merge_translations` is
+    True) if translations it was saving were also changed in the database
+    since the object was loaded. `conflicts` is a list of
+    (field name, language code) tuples.
+    """
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        super(TranslationConflict, self).__init__(
+            TRANSLATION_CONFLICT_ERROR.format(u', '.join(
+                u'{0} ({1})'.format(name, code) for name, code in conflicts
+            ))
+        )
 
 
 class MultilingualFieldsMixin(object):
     u"""Add some utility methods related to the multilingual fields."""
 
+    # When True `save()` only writes the translations changed since the
+    # object was loaded, keeping the ones changed meanwhile in the database
+    # by others (see `merge_translations_into`)
+    merge_translations = False
+    # [(field name, [language code, ...]), ...]: the translations to keep
+    # a database index on (see `multilingualfield.indexes`)
+    multilingual_indexes = ()
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get(u'update_fields')
+        if update_fields is not None:
+            # Companion columns are saved along with their fields
+            kwargs[u'update_fields'] = set(update_fields) | set(
+                field.companion_field.name
+                for field in self.__class__.multilingual_fields()
+                if field.name in update_fields
+                and getattr(field, u'companion_field', None) is not None
+            )
+        if not self.merge_translations or self._state.adding or self.pk is None:
+            return super(MultilingualFieldsMixin, self).save(*args, **kwargs)
+        using = kwargs.get(u'using') or router.db_for_write(
+            self.__class__, instance=self
+        )
+        with transaction.atomic(using=using):
+            # Values set by `prefetch_translations` are merged as any other
+            # once the rest of their translations are read
+            for field in self.__class__.multilingual_fields():
+                if field.attname in self.__dict__ and hasattr(
+                        field, u'complete_prefetched'):
+                    field.complete_prefetched(
+                        self, self.__dict__[field.attname]
+                    )
+            self.merge_translations_into(using, kwargs.get(u'update_fields'))
+            return super(MultilingualFieldsMixin, self).save(*args, **kwargs)
+
+    def merge_translations_into(self, using, update_fields=None):
+        u"""
+        Locks the row of this object and replaces the translations this
+        object didn't change since it was loaded with the ones stored in the
+        database.
+
+        Raises TranslationConflict if a translation was changed both here
+        and in the database (to a different value).
+        """
+        loaded = self.__dict__.get(fields.LOADED_TRANSLATIONS_ATTRIBUTE, {})
+        merged_fields = [
+            field for field in self.__class__.multilingual_fields()
+            if field.attname in loaded and field.attname in self.__dict__
+            and (update_fields is None or field.name in update_fields)
+        ]
+        if not merged_fields:
+            return
+        stored = self.__class__._base_manager.using(using).select_for_update(
+        ).filter(pk=self.pk).values_list(
+            *[field.attname for field in merged_fields]
+        )
+        if not stored:
+            return
+        conflicts, values = [], []
+        for field, stored_value in zip(merged_fields, stored[0]):
+            stored_value = field.to_python(stored_value)
+            theirs = fields.translations_of(stored_value)
+            previous = loaded[field.attname]
+            mine = fields.translations_of(getattr(self, field.attname))
+            merged = {}
+            for code, verbose in LANGUAGES:
+                original = previous.get(code) or u''
+                value = mine.get(code) or u''
+                other = theirs.get(code) or u''
+                if value == original:
+                    merged[code] = other
+                elif other != original and other != value:
+                    conflicts.append((field.name, code))
+                else:
+                    merged[code] = value
+            values.append((field, merged, theirs, stored_value))
+        if conflicts:
+            raise TranslationConflict(conflicts)
+
+        for field, merged, theirs, stored_value in values:
+            if isinstance(field, fields.MultiLingualFileField):
+                value = field.to_python(
+                    [merged[code] for code, verbose in LANGUAGES]
+                )
+                value.keep_renditions(stored_value)
+            else:
+                value = datastructures.MultiLingualText()
+                for code, translation in merged.items():
+                    setattr(value, code, translation)
+            setattr(self, field.attname, value)
+            # So `translations_changed` only reports the changes of this
+            # object
+            loaded[field.attname] = theirs
+
     def is_translation_complete(self, language_code):
         u"""
         Return True if all multilingual fields of the object are not empty
         for the language ``language_code``.
         """
         for field in self.__class__.multilingual_fields():
-            value = getattr(getattr(self, field.name), language_code)
-            if value is None or len(value) == 0:
+            value = getattr(self, field.attname)
+            if not coverage.is_translated(getattr(value, language_code, None)):
                 return False
         return True
 
@@ -27,28 +145,107 @@ class MultilingualFieldsMixin(object):
     def complete_translations(self):
         u"""
         Check the multilingual fields of the object and return a set with the
-        languages that 'are' in all fields.
+        languages that are translated in all of them.
 
-        .. todo:: a better explanation (a little bit tired today)
+        Every decoded value is visited once; languages are dropped as soon as
+        a field without a translation for them is found.
         """
-        translations = set()
-        for code, verbose in LANGUAGES:
-            translations.add(code)
-            for field in self.__class__.multilingual_fields():
-                value = getattr(getattr(self, field.name), code)
-                if value is None or len(value) == 0:
-                    translations.discard(code)
-                    break
-        return translations
+        return complete_languages(
+            self, self.__class__.translation_accessors(),
+            conf.settings.LANGUAGE_CODES
+        )
+
+    @classmethod
+    def bulk_complete_translations(cls, objects):
+        u"""
+        Return a dict mapping the primary key of each of ``objects`` to the
+        set of languages that are translated in all of its multilingual
+        fields.
+
+        The accessors and language codes are looked up once for all of
+        ``objects``.
+        """
+        accessors = cls.translation_accessors()
+        codes = conf.settings.LANGUAGE_CODES
+        return dict(
+            (obj.pk, complete_languages(obj, accessors, codes))
+            for obj in objects
+        )
+
+    def get_cached_translation(self, field_name, language_code=None):
+        u"""
+        Return the ``language_code`` (defaults to the language of the active
+        thread) translation of ``field_name`` through the translation cache
+        (see ``multilingualfield.cache``).
+
+        Works on instances loaded with ``field_name`` deferred, in which case
+        a cache hit doesn't touch the database column at all, nor does
+        reading the language kept in its companion column (see the
+        ``companion_language`` option of MultiLingualTextField).
+        """
+        field = self._meta.get_field(field_name)
+        companion = getattr(field, u'companion_field', None)
+        if companion is not None and field.attname not in self.__dict__ and (
+                companion.attname in self.__dict__) and (
+                (language_code or cache.current_language_code())
+                == field.companion_language):
+            return getattr(self, companion.attname)
+        return cache.get_translation(
+            self.__class__, self.pk, field_name, language_code, instance=self
+        )
+
+    @classmethod
+    def get_cached_translations(cls, objects, field_name, language_code=None):
+        u"""
+        Return a dict mapping the primary key of each of ``objects`` to its
+        ``language_code`` translation of ``field_name``, reading every cache
+        miss with a single query.
+        """
+        instances = dict((obj.pk, obj) for obj in objects)
+        return cache.get_translations(
+            cls, list(instances), field_name, language_code, instances=instances
+        )
 
     @classmethod
     def multilingual_fields(cls):
         u"""
-        Return a generator which returns the fields of the model that are
-        instance of the multilingual fields.
+        Return a tuple with the fields of the model that are instance of the
+        multilingual fields.
+
+        The tuple is built once per model class (when the class is prepared
+        or, failing that, on the first call).
+        """
+        try:
+            return cls.__dict__[u'_multilingual_fields']
+        except KeyError:
+            return cache_multilingual_fields(cls)
+
+    @classmethod
+    def translation_accessors(cls):
+        u"""
+        Return a tuple with an (attname, accessor) pair for every
+        multilingual field, where ``accessor(value)`` returns the
+        {language code: translation or file name} dict of a decoded value.
+
+        Built along with ``multilingual_fields``.
+        """
+        try:
+            return cls.__dict__[u'_translation_accessors']
+        except KeyError:
+            cache_multilingual_fields(cls)
+            return cls._translation_accessors
+
+    @classmethod
+    def translation_coverage(cls, field_names=None, language_codes=None,
+                             queryset=None):
+        u"""
+        Return the number of objects and, for each multilingual field and
+        language, the number of objects with a translation (computed with
+        a single query, see ``multilingualfield.coverage``).
         """
-        mf1, mf2 = fields.MultiLingualTextField, fields.MultiLingualFileField
-        return (f for f in cls._meta.fields if isinstance(f, mf1) or isinstance(f, mf2))
+        return coverage.translation_coverage(
+            cls, field_names, language_codes, queryset
+        )
 
     @classmethod
     def objects_with_incomplete_translations(cls, language_code,
@@ -66,3 +263,79 @@ class MultilingualFieldsMixin(object):
             for name in fields_names
         )
         return cls.objects.filter(**arguments) if inverse else cls.objects.exclude(**arguments)
+
+
+def _text_translations(value):
+    # MultiLingualText keeps its translations as attributes
+    return value.__dict__ if value is not None else {}
+
+
+def _file_translations(value):
+    # Reading the names doesn't build a MultiLingualFieldFile per language
+    return value.file_names() if value is not None else {}
+
+
+def complete_languages(obj, accessors, language_codes):
+    u"""
+    Return the set of ``language_codes`` translated in every multilingual
+    field of ``obj``, given the ``translation_accessors`` of its class.
+    """
+    translations = set(language_codes)
+    for attname, accessor in accessors:
+        if not translations:
+            break
+        present = accessor(getattr(obj, attname))
+        translations = set(code for code in translations if present.get(code))
+    return translations
+
+
+def cache_multilingual_fields(cls, **kwargs):
+    u"""
+    Store the multilingual fields of ``cls`` on it (as
+    ``_multilingual_fields``), along with their ``translation_accessors``,
+    and return them.
+    """
+    mf = (fields.MultiLingualTextField, fields.MultiLingualFileField)
+    cls._multilingual_fields = tuple(
+        f for f in cls._meta.fields if isinstance(f, mf)
+    )
+    cls._translation_accessors = tuple(
+        (f.attname, _file_translations if isinstance(
+            f, fields.MultiLingualFileField) else _text_translations)
+        for f in cls._multilingual_fields
+    )
+    return cls._multilingual_fields
+
+
+def prepare_multilingual_model(sender, **kwargs):
+    if issubclass(sender, MultilingualFieldsMixin):
+        cache_multilingual_fields(sender)
+
+class_prepared.connect(prepare_multilingual_model)
+
+
+class TranslationCoverage(models.Model):
+    u"""
+    The number of objects of ``model`` with ``field_name`` translated into
+    ``language_code`` (see ``multilingualfield.coverage``).
+    """
+    model = models.CharField(_(u'model'), max_length=100, db_index=True)
+    field_name = models.CharField(_(u'field name'), max_length=100)
+    language_code = models.CharField(_(u'language code'), max_length=15)
+    translated = models.IntegerField(_(u'translated'), default=0)
+    total = models.IntegerField(_(u'total'), default=0)
+
+    class Meta:
+        unique_together = ((u'model', u'field_name', u'language_code'),)
+        verbose_name = _(u'translation coverage')
+        verbose_name_plural = _(u'translation coverage')
+
+    def __unicode__(self):
+        return u'{0}.{1} ({2}): {3}/{4}'.format(
+            self.model, self.field_name, self.language_code,
+            self.translated, self.total
+        )
+
+    @property
+    def percentage(self):
+        return 100.0 * self.translated / self.total if self.total else 0.0
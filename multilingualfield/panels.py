@@ -0,0 +1,49 @@
+u"""
+A django-debug-toolbar panel that displays the multilingual field
+instrumentation counters for the current request.
+
+Requires `MULTILINGUALFIELD_INSTRUMENTATION = True`. Add it to your
+toolbar configuration::
+
+    DEBUG_TOOLBAR_PANELS += (
+        'multilingualfield.panels.MultilingualFieldPanel',
+    )
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from debug_toolbar.panels import Panel
+from django.utils.translation import ugettext_lazy as _
+
+from . import instrumentation
+
+
+class MultilingualFieldPanel(Panel):
+    title = _(u'Multilingual fields')
+    template = u'multilingualfield/panels/instrumentation.html'
+
+    @property
+    def nav_subtitle(self):
+        stats = self.get_stats()
+        if not stats:
+            return _(u'Instrumentation disabled')
+        return _(u'{0} decoded, {1} encoded').format(
+            stats[u'events'][instrumentation.DECODE][u'count'],
+            stats[u'events'][instrumentation.ENCODE][u'count']
+        )
+
+    def process_request(self, request):
+        instrumentation.reset()
+
+    def process_response(self, request, response):
+        if not instrumentation.is_enabled():
+            return
+        events = instrumentation.get_stats().as_dict()
+        self.record_stats({
+            u'events': events,
+            u'rows': [
+                (event, events[event][u'count'], events[event][u'time'] * 1000)
+                for event in instrumentation.EVENTS
+            ],
+        })
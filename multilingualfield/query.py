@@ -0,0 +1,451 @@
+u"""
+Database-side updates of single translations.
+
+`SetTranslation('title', 'es', u'Hola')` is an update expression that sets
+one translation within the stored XML, leaving every other language as it
+is in the database at the time of the UPDATE::
+
+    Article.objects.filter(pk=1).update(
+        title=SetTranslation('title', 'es', u'Hola')
+    )
+
+Querysets of `MultilingualManager` also accept the shorter
+`field__language` keyword arguments::
+
+    Article.objects.filter(pk=1).update(title__es=u'Hola', title__fr=u'Salut')
+
+Neither decodes nor re-encodes anything in Python, and concurrent changes
+to different languages of the same object don't overwrite each other.
+Companion columns (see the `companion_language` option of
+MultiLingualTextField) are updated along with their fields.
+
+`prefetch_translations` has the database extract a single translation of
+multilingual text fields, on the queried model or on related ones::
+
+    Book.objects.prefetch_translations(
+        'title', 'author__bio', 'publisher__name', language='es'
+    )
+
+Fields of the queried model are read in the same query and every related
+model takes one additional query. Their values are MultiLingualTexts
+holding only that translation (see `prefetch_translations`).
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from django.core.exceptions import FieldError
+from django.db import connections, models, transaction
+
+from . import cache, datastructures, fields, utils, LANGUAGES
+from .sql import (
+    compose, concat_sql, param, set_translation_sql, translation_sql
+)
+
+NOT_MULTILINGUAL_ERROR = u'`{0}` is not a multilingual field.'
+MISMATCHED_FIELD_ERROR = (
+    u'SetTranslation({0!r}, ...) can\'t be used to update `{1}`.'
+)
+COMPRESSED_FIELD_ERROR = (
+    u'Translations of `{0}` can\'t be updated within the database because '
+    u'its values may be compressed.'
+)
+UNKNOWN_LANGUAGE_ERROR = u'`{0}` is not in LANGUAGES.'
+NOT_PREFETCHABLE_ERROR = (
+    u'`{0}` doesn\'t lead to a multilingual text field through foreign keys.'
+)
+PREFETCH_ARGUMENTS_ERROR = (
+    u'prefetch_translations() only takes a `language` keyword argument.'
+)
+# The extra select alias of a prefetched translation
+PREFETCH_ALIAS = u'{0}_prefetched_translation'
+
+
+class SetTranslation(object):
+    u"""
+    An update expression setting the `language_code` translation of the
+    multilingual field `field_name` to `value` (a string or, for
+    MultiLingualFileFields, the name of an already stored file).
+    """
+
+    def __init__(self, field_name, language_code, value):
+        if language_code not in [code for code, verbose in LANGUAGES]:
+            raise FieldError(UNKNOWN_LANGUAGE_ERROR.format(language_code))
+        self.field_name = field_name
+        self.language_code = language_code
+        self.value = getattr(value, u'name', value)
+        self.field = None
+
+    def prepare_database_save(self, field):
+        u"""Binds the expression to the field being updated."""
+        if field.name != self.field_name:
+            raise FieldError(
+                MISMATCHED_FIELD_ERROR.format(self.field_name, field.name)
+            )
+        check_field(field)
+        self.field = field
+        return self
+
+    def as_sql(self, qn, connection):
+        return set_translation_sql(
+            connection, qn(self.field.column), self.language_code, self.value
+        )
+
+
+def prefetched_translation_sql(connection, field, language_code):
+    u"""
+    Returns a (sql, params) expression evaluating to '<' followed by the
+    `language_code` translation of `field` (still escaped) or, for values
+    the database can't look into (compressed ones and plain text), to the
+    stored value itself.
+    """
+    column = u'{0}.{1}'.format(
+        connection.ops.quote_name(field.model._meta.db_table),
+        connection.ops.quote_name(field.column)
+    )
+    return compose(
+        u'CASE WHEN {0} LIKE {1} THEN {2} ELSE {0} END',
+        (column, []), param(u'<%'),
+        concat_sql(
+            connection, param(u'<'),
+            translation_sql(connection, column, language_code)
+        )
+    )
+
+
+def prefetched_translation(raw, language_code):
+    u"""
+    Returns a MultiLingualText with only the `language_code` translation
+    from `raw`, a value selected with `prefetched_translation_sql`.
+    """
+    value = datastructures.MultiLingualText()
+    if raw is None:
+        return value
+    if raw.startswith(u'<'):
+        text = utils.unescape_xml_text(raw[1:])
+    else:
+        text = utils.extract_languages(raw, [language_code]).get(
+            language_code, u''
+        )
+    setattr(value, language_code, text)
+    return value
+
+
+def attach_translation(instance, field, language_code, raw):
+    u"""
+    Sets `field` of `instance` to the prefetched translation `raw` and
+    records it so saving `instance` keeps its other translations (see
+    `MultiLingualTextField.pre_save`).
+    """
+    value = prefetched_translation(raw, language_code)
+    setattr(instance, field.attname, value)
+    instance.__dict__.setdefault(
+        fields.PREFETCHED_TRANSLATIONS_ATTRIBUTE, {}
+    )[field.attname] = (
+        value, language_code, getattr(value, language_code)
+    )
+
+
+def resolve_translation_lookup(model, lookup):
+    u"""
+    Returns the ([relation field, ...], multilingual text field) `lookup`
+    ('author__bio') leads to from `model`.
+    """
+    names = lookup.split(u'__')
+    relations = []
+    for name in names[:-1]:
+        try:
+            relation = model._meta.get_field(name)
+        except models.FieldDoesNotExist:
+            raise FieldError(NOT_PREFETCHABLE_ERROR.format(lookup))
+        if not isinstance(relation, models.ForeignKey):
+            raise FieldError(NOT_PREFETCHABLE_ERROR.format(lookup))
+        relations.append(relation)
+        model = relation.rel.to
+    try:
+        field = model._meta.get_field(names[-1])
+    except models.FieldDoesNotExist:
+        raise FieldError(NOT_PREFETCHABLE_ERROR.format(lookup))
+    if not isinstance(field, fields.MultiLingualTextField):
+        raise FieldError(NOT_PREFETCHABLE_ERROR.format(lookup))
+    return relations, field
+
+
+def prefetch_translations(instances, lookups, language_code, using):
+    u"""
+    Sets the multilingual text fields `lookups` lead to from `instances`
+    (model instances read from the `using` database) to MultiLingualTexts
+    holding only their `language_code` translation.
+
+    Related objects not loaded yet (i.e. with `select_related`) are read
+    with one query per relation, along with their translations; those
+    already loaded only have their deferred fields read.
+    """
+    if not instances:
+        return
+    connection = connections[using]
+    model = instances[0].__class__._meta.concrete_model
+    # {relation path: [field, ...]}
+    wanted = {}
+    for lookup in lookups:
+        relations, field = resolve_translation_lookup(model, lookup)
+        wanted.setdefault(tuple(relations), []).append(field)
+        for depth in range(len(relations)):
+            wanted.setdefault(tuple(relations[:depth]), [])
+    # {relation path: [instance, ...]}
+    loaded = {(): instances}
+    for path in sorted(wanted, key=len):
+        if path:
+            loaded[path] = load_related(
+                loaded[path[:-1]], path[-1], wanted[path], language_code,
+                using
+            )
+        missing = [
+            instance for instance in loaded[path]
+            if any(field.attname not in instance.__dict__ for field in wanted[path])
+        ]
+        if not missing:
+            continue
+        related_model = missing[0].__class__._meta.concrete_model
+        queryset = related_model._base_manager.using(using).filter(
+            pk__in=set(instance.pk for instance in missing)
+        )
+        for field in wanted[path]:
+            sql, params = prefetched_translation_sql(
+                connection, field, language_code
+            )
+            queryset = queryset.extra(
+                select={PREFETCH_ALIAS.format(field.name): sql},
+                select_params=params
+            )
+        aliases = [PREFETCH_ALIAS.format(field.name) for field in wanted[path]]
+        rows = dict(
+            (row[0], row[1:])
+            for row in queryset.values_list(u'pk', *aliases)
+        )
+        for instance in missing:
+            for field, raw in zip(wanted[path], rows.get(instance.pk, ())):
+                if field.attname not in instance.__dict__:
+                    attach_translation(instance, field, language_code, raw)
+
+
+def load_related(instances, relation, prefetched, language_code, using):
+    u"""
+    Returns the objects `relation` (a ForeignKey) points to from
+    `instances`, reading those not cached yet with a single query which
+    also selects the `language_code` translation of the `prefetched` fields
+    (instead of their whole values).
+    """
+    cache_name = relation.get_cache_name()
+    to_field = relation.rel.get_related_field()
+    related = []
+    pending = {}
+    for instance in instances:
+        if hasattr(instance, cache_name):
+            if getattr(instance, cache_name) is not None:
+                related.append(getattr(instance, cache_name))
+            continue
+        key = getattr(instance, relation.attname)
+        if key is not None:
+            pending.setdefault(key, []).append(instance)
+    if not pending:
+        return related
+
+    connection = connections[using]
+    queryset = relation.rel.to._base_manager.using(using).filter(
+        **{u'{0}__in'.format(to_field.name): list(pending)}
+    )
+    if prefetched:
+        queryset = queryset.defer(*[field.name for field in prefetched])
+    for field in prefetched:
+        sql, params = prefetched_translation_sql(
+            connection, field, language_code
+        )
+        queryset = queryset.extra(
+            select={PREFETCH_ALIAS.format(field.name): sql},
+            select_params=params
+        )
+    for obj in queryset:
+        for field in prefetched:
+            attach_translation(
+                obj, field, language_code,
+                obj.__dict__.pop(PREFETCH_ALIAS.format(field.name))
+            )
+        for instance in pending.get(getattr(obj, to_field.attname), ()):
+            setattr(instance, cache_name, obj)
+        related.append(obj)
+    return related
+
+
+def check_field(field):
+    u"""
+    Raises FieldError unless the translations of `field` can be updated
+    within the database.
+    """
+    multilingual = (fields.MultiLingualTextField, fields.MultiLingualFileField)
+    if not isinstance(field, multilingual):
+        raise FieldError(NOT_MULTILINGUAL_ERROR.format(field.name))
+    if getattr(field, u'compress', False):
+        raise FieldError(COMPRESSED_FIELD_ERROR.format(field.name))
+
+
+class MultilingualQuerySet(models.query.QuerySet):
+    u"""
+    A QuerySet whose `update` accepts `field__language=value` arguments
+    (see `SetTranslation`) and that can prefetch single translations (see
+    `prefetch_translations`).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(MultilingualQuerySet, self).__init__(*args, **kwargs)
+        # [(lookup, language code), ...]
+        self._translation_lookups = []
+
+    def _clone(self, *args, **kwargs):
+        clone = super(MultilingualQuerySet, self)._clone(*args, **kwargs)
+        clone._translation_lookups = self._translation_lookups[:]
+        return clone
+
+    def _fetch_all(self):
+        fetching = self._result_cache is None
+        super(MultilingualQuerySet, self)._fetch_all()
+        if not fetching or not self._translation_lookups:
+            return
+        instances = [
+            obj for obj in self._result_cache if isinstance(obj, models.Model)
+        ]
+        by_language = {}
+        for lookup, language_code in self._translation_lookups:
+            by_language.setdefault(language_code, []).append(lookup)
+            if u'__' in lookup:
+                continue
+            # Own fields were extracted by the query itself
+            field = self.model._meta.get_field(lookup)
+            alias = PREFETCH_ALIAS.format(field.name)
+            for instance in instances:
+                if alias in instance.__dict__:
+                    attach_translation(
+                        instance, field, language_code,
+                        instance.__dict__.pop(alias)
+                    )
+        for language_code, lookups in by_language.items():
+            prefetch_translations(instances, lookups, language_code, self.db)
+
+    def prefetch_translations(self, *lookups, **kwargs):
+        u"""
+        Returns a new QuerySet whose objects hold only the `language`
+        (defaults to the language active now) translation of the
+        multilingual text fields `lookups` lead to: their own ('title') or
+        those of the objects foreign keys point to ('author__bio').
+
+        Own fields are extracted in the same query. Each related model
+        takes one additional query, which also loads the related objects
+        that `select_related` didn't. Saving an object completes its
+        prefetched values with the translations stored in the database.
+        """
+        language_code = kwargs.pop(u'language', None)
+        if kwargs:
+            raise TypeError(PREFETCH_ARGUMENTS_ERROR)
+        language_code = language_code or cache.current_language_code()
+        if language_code not in [code for code, verbose in LANGUAGES]:
+            raise FieldError(UNKNOWN_LANGUAGE_ERROR.format(language_code))
+        clone = self._clone()
+        connection = connections[clone.db]
+        for lookup in lookups:
+            relations, field = resolve_translation_lookup(self.model, lookup)
+            clone._translation_lookups.append((lookup, language_code))
+            if relations:
+                continue
+            sql, params = prefetched_translation_sql(
+                connection, field, language_code
+            )
+            clone = clone.defer(field.name).extra(
+                select={PREFETCH_ALIAS.format(field.name): sql},
+                select_params=params
+            )
+        return clone
+
+    def update(self, **kwargs):
+        u"""
+        Updates all elements in the current QuerySet; `field__language`
+        arguments set a single translation of a multilingual field.
+
+        Setting several languages of the same field takes one UPDATE per
+        language, all of them within a single transaction.
+        """
+        updates = [{}]
+        for name, value in self.with_companions(kwargs).items():
+            field_name, sep, language_code = name.partition(u'__')
+            if sep:
+                value = SetTranslation(field_name, language_code, value)
+                name = field_name
+            # Every UPDATE can set a column once
+            for values in updates:
+                if name not in values:
+                    values[name] = value
+                    break
+            else:
+                updates.append({name: value})
+
+        pks = None
+        if cache.is_enabled():
+            pks = list(self.values_list(u'pk', flat=True))
+        with transaction.atomic(using=self.db):
+            rows = super(MultilingualQuerySet, self).update(**updates[0])
+            for values in updates[1:]:
+                super(MultilingualQuerySet, self).update(**values)
+        for pk in pks or []:
+            cache.invalidate(self.model, pk)
+        return rows
+    update.alters_data = True
+
+    def with_companions(self, kwargs):
+        u"""
+        Returns the `update` keyword arguments `kwargs` plus the values of
+        the companion columns of the fields they change.
+        """
+        result = dict(kwargs)
+        for name, value in kwargs.items():
+            field_name, sep, language_code = name.partition(u'__')
+            try:
+                field = self.model._meta.get_field(field_name)
+            except models.FieldDoesNotExist:
+                continue
+            companion = getattr(field, u'companion_field', None)
+            if companion is None or companion.name in kwargs:
+                continue
+            if isinstance(value, SetTranslation):
+                language_code, value = value.language_code, value.value
+            elif not sep:
+                if value is not None and not isinstance(
+                        value, (basestring, datastructures.MultiLingualText)):
+                    continue
+                result[companion.name] = field.companion_value(value)
+                continue
+            if language_code == field.companion_language:
+                result[companion.name] = field.companion_text(value)
+        return result
+
+    def defer_to_companions(self, *field_names):
+        u"""
+        Defers the multilingual fields (all or `field_names`) that have
+        a companion column, so listings only read their companion language.
+        """
+        return self.defer(*[
+            field.name for field in self.model._meta.fields
+            if getattr(field, u'companion_field', None) is not None
+            and (not field_names or field.name in field_names)
+        ])
+
+
+class MultilingualManager(models.Manager):
+    u"""A manager returning MultilingualQuerySets."""
+
+    def get_queryset(self):
+        return MultilingualQuerySet(self.model, using=self._db)
+
+    def defer_to_companions(self, *field_names):
+        return self.get_queryset().defer_to_companions(*field_names)
+
+    def prefetch_translations(self, *lookups, **kwargs):
+        return self.get_queryset().prefetch_translations(*lookups, **kwargs)
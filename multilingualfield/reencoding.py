@@ -0,0 +1,281 @@
+u"""
+Bulk re-encoding of stored multilingual values.
+
+`reencode` rewrites the values of some multilingual fields of a model in
+one of the `MODES`:
+
+* `normalize`: languages in `LANGUAGES` order (others after them),
+  compressed as the field is configured
+* `compress`: normalized and compressed (when longer than the field's
+  threshold), i.e. after setting `compress=True` on a field
+* `decompress`: normalized and never compressed, i.e. before removing
+  `compress=True` from a field
+
+Rows are read in primary key order, a chunk at a time (see
+`exchange.iter_chunks`). Decoding and re-encoding chunks (the CPU-bound
+part) is fanned out to a `multiprocessing` pool while the next chunks are
+read, and each chunk's changes are written back with a single UPDATE in
+its own transaction. The UPDATE only replaces values that still hold what
+was read, so rows saved meanwhile are left alone.
+
+A checkpoint file records the last primary key written, so an interrupted
+run resumes where it stopped; `rows_per_second` throttles the whole
+process.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import json
+import os
+import time
+from collections import deque
+
+from django.db import connections, router, transaction
+from django.utils.encoding import force_text
+
+from . import cache, conf, utils
+from .exchange import DEFAULT_CHUNK_SIZE, iter_chunks
+
+MODES = (u'normalize', u'compress', u'decompress')
+UNKNOWN_MODE_ERROR = u"Unknown mode '{0}' (one of: {1})."
+CHECKPOINT_MISMATCH_ERROR = (
+    u'The checkpoint in {0} was written for another model, fields or mode.'
+)
+
+
+def reencode_value(raw, language_codes, compress, threshold):
+    u"""
+    Returns `raw` (a stored value) with its languages in `language_codes`
+    order, compressed when `compress` is True (and it is longer than
+    `threshold`), or None if that's what `raw` already is.
+    """
+    from lxml import etree
+    xml = utils.decompress_xml(raw)
+    if not xml:
+        return None
+    if xml.startswith(u'<'):
+        root = etree.fromstring(xml)
+    else:
+        # Plain text is the first language's (see MultiLingualText)
+        root = etree.Element(u'languages')
+        etree.SubElement(root, u'language', code=language_codes[0]).text = xml
+    order = dict((code, index) for index, code in enumerate(language_codes))
+    children = list(root)
+    languages = [child for child in children if child.tag == u'language']
+    languages.sort(key=lambda child: order.get(child.get(u'code'), len(order)))
+    others = [child for child in children if child.tag != u'language']
+    for child in children:
+        root.remove(child)
+    root.text = None
+    for child in languages + others:
+        child.tail = None
+        root.append(child)
+    for child in languages:
+        # As MultiLingualText.as_xml writes empty translations
+        child.text = child.text or u''
+    value = etree.tostring(root).decode(u'ascii')
+    if compress:
+        value = utils.compress_xml(value, threshold)
+    return None if value == raw else value
+
+
+def reencode_rows(task):
+    u"""
+    Re-encodes a chunk of rows in a pool worker. `task` is a
+    (rows, [(compress, threshold) per field], language codes) tuple, with
+    `(pk, raw value, raw value, ...)` rows; returns [(pk, field index, old
+    value, new value)] for the values that change.
+    """
+    rows, encodings, language_codes = task
+    changes = []
+    for row in rows:
+        for index, (compress, threshold) in enumerate(encodings):
+            old = row[index + 1]
+            new = reencode_value(old, language_codes, compress, threshold)
+            if new is not None:
+                changes.append((row[0], index, old, new))
+    return changes
+
+
+def write_changes(model, field, changes, using):
+    u"""
+    Sets `field` to the new value of every (pk, old, new) in `changes`,
+    for the rows where it still is `old`, with as few UPDATEs as the
+    database's limit on parameters allows. Returns the number of rows
+    updated.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    pk_column = qn(model._meta.pk.column)
+    column = qn(field.column)
+    # Every change takes four parameters
+    batch_size = max(connection.ops.bulk_batch_size(
+        [model._meta.pk, field] * 2, changes
+    ), 1)
+    cursor = connection.cursor()
+    updated = 0
+    for start in range(0, len(changes), batch_size):
+        cases, conditions, case_params, condition_params = [], [], [], []
+        for pk, old, new in changes[start:start + batch_size]:
+            cases.append(u'WHEN %s THEN %s')
+            case_params.extend([pk, new])
+            conditions.append(
+                u'({0} = %s AND {1} = %s)'.format(pk_column, column)
+            )
+            condition_params.extend([pk, old])
+        sql = u'UPDATE {0} SET {1} = CASE {2} {3} END WHERE {4}'.format(
+            qn(model._meta.db_table), column, pk_column, u' '.join(cases),
+            u' OR '.join(conditions)
+        )
+        cursor.execute(sql, case_params + condition_params)
+        updated += cursor.rowcount
+    return updated
+
+
+class Checkpoint(object):
+    u"""
+    The progress of a run, kept (when `path` is given) in a JSON file that
+    is replaced atomically after every chunk. The last primary key is kept
+    as text and converted back with `pk_field` (so UUID or Decimal keys
+    work too).
+    """
+
+    def __init__(self, path, key, pk_field):
+        self.path = path
+        self.key = key
+        self.pk_field = pk_field
+        self.last_pk = None
+        self.processed = 0
+        self.changed = 0
+        if path and os.path.exists(path):
+            with open(path) as checkpoint_file:
+                data = json.load(checkpoint_file)
+            if data.get(u'key') != key:
+                raise ValueError(CHECKPOINT_MISMATCH_ERROR.format(path))
+            if data[u'last_pk'] is not None:
+                self.last_pk = pk_field.to_python(data[u'last_pk'])
+            self.processed = data[u'processed']
+            self.changed = data[u'changed']
+
+    def save(self):
+        if not self.path:
+            return
+        temporary = self.path + u'.tmp'
+        with open(temporary, u'w') as checkpoint_file:
+            json.dump({
+                u'key': self.key,
+                u'last_pk': (
+                    force_text(self.last_pk) if self.last_pk is not None
+                    else None
+                ),
+                u'processed': self.processed,
+                u'changed': self.changed,
+            }, checkpoint_file)
+        os.rename(temporary, self.path)
+
+    def delete(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def reencode(model, fields, mode=u'normalize', workers=None,
+             chunk_size=DEFAULT_CHUNK_SIZE, rows_per_second=None,
+             checkpoint_path=None, progress=None, using=None):
+    u"""
+    Re-encodes the values of `fields` (multilingual fields of `model`) as
+    described by `mode` and returns the Checkpoint of the run.
+
+    * `workers`: processes decoding and re-encoding chunks (defaults to the
+      number of CPUs; 0 does the work in this process). The database
+      connections are closed before they are started, so don't call this
+      within a transaction unless `workers` is 0
+    * `rows_per_second`: the maximum average rate rows are read at
+    * `checkpoint_path`: a file where progress is kept; a run started with
+      the same file resumes after the last chunk written (the file is
+      removed once the run completes)
+    * `progress`: called with the Checkpoint after every chunk
+    """
+    if mode not in MODES:
+        raise ValueError(UNKNOWN_MODE_ERROR.format(mode, u', '.join(MODES)))
+    using = using or router.db_for_write(model)
+    encodings = []
+    for field in fields:
+        threshold = getattr(field, u'compress_threshold', None)
+        if threshold is None:
+            threshold = conf.settings.COMPRESS_THRESHOLD
+        compress = {
+            u'normalize': getattr(field, u'compress', False),
+            u'compress': True,
+            u'decompress': False,
+        }[mode]
+        encodings.append((compress, threshold))
+    language_codes = list(conf.settings.LANGUAGE_CODES)
+    checkpoint = Checkpoint(checkpoint_path, u'{0}.{1}:{2}:{3}'.format(
+        model._meta.app_label, model._meta.object_name,
+        u','.join(field.name for field in fields), mode
+    ), model._meta.pk)
+
+    pool = None
+    if workers is None or workers > 0:
+        from multiprocessing import Pool, cpu_count
+        # Workers only get rows, but the forked processes would still share
+        # the sockets of the connections open here; this process reconnects
+        # when it next queries
+        for connection in connections.all():
+            connection.close()
+        workers = workers or cpu_count()
+        pool = Pool(workers)
+
+    queryset = model._default_manager.db_manager(using).all()
+    if checkpoint.last_pk is not None:
+        queryset = queryset.filter(pk__gt=checkpoint.last_pk)
+    started = time.time()
+    read = 0
+    pending = deque()
+
+    def write(rows, changes):
+        by_field = [[] for field in fields]
+        for pk, index, old, new in changes:
+            by_field[index].append((pk, old, new))
+        with transaction.atomic(using=using):
+            for field, field_changes in zip(fields, by_field):
+                if field_changes:
+                    checkpoint.changed += write_changes(
+                        model, field, field_changes, using
+                    )
+        if cache.is_enabled():
+            for pk in set(change[0] for change in changes):
+                cache.invalidate(model, pk)
+        checkpoint.last_pk = rows[-1][0]
+        checkpoint.processed += len(rows)
+        checkpoint.save()
+        if progress is not None:
+            progress(checkpoint)
+
+    try:
+        for rows in iter_chunks(queryset, fields, chunk_size):
+            task = (rows, encodings, language_codes)
+            if pool is None:
+                write(rows, reencode_rows(task))
+            else:
+                pending.append((rows, pool.apply_async(reencode_rows, (task,))))
+                # Keeping every worker busy, and no more chunks than that
+                # in memory
+                if len(pending) > workers:
+                    done_rows, result = pending.popleft()
+                    write(done_rows, result.get())
+            read += len(rows)
+            if rows_per_second:
+                delay = read / rows_per_second - (time.time() - started)
+                if delay > 0:
+                    time.sleep(delay)
+        while pending:
+            done_rows, result = pending.popleft()
+            write(done_rows, result.get())
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    checkpoint.delete()
+    return checkpoint
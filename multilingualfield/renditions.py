@@ -0,0 +1,282 @@
+u"""
+Resized/converted copies ("renditions") of the images stored in
+MultiLingualFileFields, generated in the background for every language.
+
+Declare them on the field::
+
+    poster = MultiLingualFileField(upload_to='posters', renditions={
+        'thumb': {'size': (200, 200)},
+        'large_webp': {'size': (1600, 1600), 'format': 'WEBP'},
+    })
+
+After an object is saved, a job is queued for every language file missing
+some of them. Jobs are queued from `post_save`, possibly before the
+transaction saving the object commits, so a job that doesn't find the
+file it refers to yet retries for a few seconds. Jobs run on the queue
+named by
+`MULTILINGUALFIELD_RENDITION_QUEUE` (an in-process `LocalQueue` by
+default). Each job stores the renditions next to the source file and
+records them in the field's XML, after the language elements::
+
+    <rendition code="es" name="thumb" source="posters/a.jpg">posters/a.thumb.jpg</rendition>
+
+Templates then read `obj.poster.es.renditions.thumb.url` (or call
+`obj.poster.es.rendition('thumb')`), with no storage access. Renditions of
+a replaced file are dropped.
+
+Generating renditions requires Pillow.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, router, transaction
+from django.db.models import get_model
+from django.utils.module_loading import import_by_path
+
+from . import cache
+
+logger = logging.getLogger(u'multilingualfield.renditions')
+
+DEFAULT_QUEUE = u'multilingualfield.renditions.LocalQueue'
+RENDITION_NAME = u'{0}.{1}{2}'
+FORMAT_EXTENSIONS = {
+    u'JPEG': u'.jpg',
+    u'PNG': u'.png',
+    u'GIF': u'.gif',
+    u'WEBP': u'.webp',
+}
+MISSING_PILLOW_ERROR = u'Generating renditions requires Pillow.'
+# The seconds a job waits before reading its object again, each time it
+# doesn't find its source file (i.e. the saving transaction hasn't
+# committed yet)
+RETRY_DELAYS = (0.2, 0.5, 1, 2, 4)
+
+RenditionJob = namedtuple(
+    u'RenditionJob', u'model_label pk field_name language_code source'
+)
+
+
+def rendition_name(source, name, options):
+    u"""
+    Returns the file name of the `name` rendition (generated with `options`)
+    of the file `source`: 'posters/a.jpg' -> 'posters/a.thumb.jpg'.
+    """
+    root, extension = os.path.splitext(source)
+    image_format = options.get(u'format')
+    if image_format:
+        extension = FORMAT_EXTENSIONS.get(
+            image_format.upper(), u'.' + image_format.lower()
+        )
+    return RENDITION_NAME.format(root, name, extension)
+
+
+def render(storage, source, name, options):
+    u"""
+    Generates the `name` rendition of `source` (in `storage`) as described
+    by `options`: `size` (a (width, height) bounding box), `format` (a
+    Pillow format, defaults to the source's) and `save_options` (passed to
+    `Image.save`). Returns the name it was stored as (an existing file is
+    never overwritten: it may be a rendition another job recorded).
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImproperlyConfigured(MISSING_PILLOW_ERROR)
+    source_file = storage.open(source, u'rb')
+    try:
+        image = Image.open(source_file)
+        image.load()
+    finally:
+        source_file.close()
+    image_format = (options.get(u'format') or image.format or u'PNG').upper()
+    if options.get(u'size'):
+        image.thumbnail(tuple(options[u'size']), Image.ANTIALIAS)
+    if image_format == u'JPEG' and image.mode not in (u'RGB', u'L'):
+        image = image.convert(u'RGB')
+    output = BytesIO()
+    image.save(output, image_format, **options.get(u'save_options', {}))
+    return storage.save(
+        rendition_name(source, name, options), ContentFile(output.getvalue())
+    )
+
+
+def missing_renditions(field, value, language_code):
+    u"""
+    Returns the names of the renditions of `field` that haven't been
+    generated for the `language_code` file of `value` (a MultiLingualFile).
+    """
+    return sorted(set(field.renditions) - set(value.renditions_for(language_code)))
+
+
+def record_renditions(model, pk, field, language_code, source, renditions):
+    u"""
+    Records the `renditions` ({rendition name: file name}) of the
+    `language_code` file of `field` for the object `pk` that haven't been
+    recorded yet (i.e. by a job racing this one), as long as that file is
+    still `source`. Returns the renditions recorded for it afterwards ({} if
+    it isn't `source` anymore).
+    """
+    using = router.db_for_write(model)
+    manager = model._base_manager.db_manager(using)
+    with transaction.atomic(using=using):
+        rows = list(manager.select_for_update().filter(pk=pk).values_list(
+            field.attname, flat=True
+        ))
+        if not rows:
+            return {}
+        value = field.to_python(rows[0])
+        if value.file_names().get(language_code) != source:
+            return {}
+        recorded = value.renditions_for(language_code)
+        new = dict(
+            (name, file_name) for name, file_name in renditions.items()
+            if name not in recorded
+        )
+        if not new:
+            return recorded
+        value.set_renditions(language_code, new)
+        manager.filter(pk=pk).update(**{field.attname: value.as_xml()})
+    if cache.is_enabled():
+        cache.invalidate(model, pk)
+    return value.renditions_for(language_code)
+
+
+def stored_value(model, field, pk):
+    u"""Returns the stored value of `field` for the object `pk` (or None)."""
+    rows = list(model._base_manager.filter(pk=pk).values_list(
+        field.attname, flat=True
+    ))
+    return field.to_python(rows[0]) if rows else None
+
+
+def run_job(job, retry_delays=RETRY_DELAYS):
+    u"""
+    Generates the missing renditions `job` (a RenditionJob) refers to and
+    records them.
+
+    Until its object holds `job.source` the job reads it again after each
+    of `retry_delays` and gives up (returning False) once they're over.
+    """
+    model = get_model(*job.model_label.split(u'.'))
+    field = model._meta.get_field(job.field_name)
+    delays = list(retry_delays)
+    while True:
+        value = stored_value(model, field, job.pk)
+        if value is not None and value.file_names().get(
+                job.language_code) == job.source:
+            break
+        if not delays:
+            return False
+        time.sleep(delays.pop(0))
+    renditions = dict(
+        (name, render(field.storage, job.source, name, field.renditions[name]))
+        for name in missing_renditions(field, value, job.language_code)
+    )
+    if not renditions:
+        return False
+    recorded = record_renditions(
+        model, job.pk, field, job.language_code, job.source, renditions
+    )
+    # Files nobody refers to: the source was replaced or a racing job
+    # recorded its renditions first
+    for name, file_name in renditions.items():
+        if recorded.get(name) != file_name:
+            field.storage.delete(file_name)
+    return any(
+        recorded.get(name) == file_name
+        for name, file_name in renditions.items()
+    )
+
+
+def _run_logged(job):
+    try:
+        return run_job(job)
+    except Exception:
+        logger.exception(u'Generating renditions for %r failed.', job)
+    finally:
+        close_old_connections()
+
+
+class ImmediateQueue(object):
+    u"""
+    Runs jobs as soon as they're submitted (i.e. in tests), on the
+    connection that saved the object so they never have to wait for it.
+    """
+
+    def submit(self, job):
+        return run_job(job, retry_delays=())
+
+
+class LocalQueue(object):
+    u"""
+    Runs jobs on an in-process pool of `workers` threads, each with database
+    connections of its own. Failures are logged to the
+    `multilingualfield.renditions` logger.
+
+    Processes aren't an option: forking the running web process would share
+    its open database connections with the children. Use a task queue to
+    run jobs elsewhere.
+    """
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    from multiprocessing.pool import ThreadPool
+                    self._pool = ThreadPool(self.workers)
+        return self._pool
+
+    def submit(self, job):
+        return self.get_pool().apply_async(_run_logged, (job,))
+
+
+_queue = None
+
+
+def get_queue():
+    u"""
+    Returns the queue jobs are submitted to: an instance of the class named
+    by `MULTILINGUALFIELD_RENDITION_QUEUE` (any class with a `submit(job)`
+    method that eventually calls `run_job(job)`).
+    """
+    global _queue
+    if _queue is None:
+        _queue = import_by_path(getattr(
+            settings, u'MULTILINGUALFIELD_RENDITION_QUEUE', DEFAULT_QUEUE
+        ))()
+    return _queue
+
+
+def queue_missing_renditions(field, instance):
+    u"""
+    Submits a job for every language of `field` (on `instance`) with
+    missing renditions.
+    """
+    value = instance.__dict__.get(field.attname)
+    if not hasattr(value, u'renditions_for'):
+        return
+    model = instance.__class__._meta.concrete_model
+    model_label = u'{0}.{1}'.format(
+        model._meta.app_label, model._meta.object_name
+    )
+    for code, name in sorted(value.file_names().items()):
+        if name and missing_renditions(field, value, code):
+            get_queue().submit(
+                RenditionJob(model_label, instance.pk, field.name, code, name)
+            )
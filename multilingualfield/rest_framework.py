@@ -0,0 +1,115 @@
+u"""
+A Django REST Framework (3.x) serializer field for multilingual values.
+
+`MultiLingualField` represents a MultiLingualTextField value as a
+{language code: text} object and a MultiLingualFileField value as a
+{language code: file URL} object::
+
+    class ArticleSerializer(serializers.ModelSerializer):
+        title = MultiLingualField()
+        image = MultiLingualField()
+
+Clients can ask for some languages only with the `languages` query
+parameter (`?languages=en,es`) or, for fields created with
+`accept_language=True`, the `Accept-Language` header. Languages left out of
+written data keep their current values.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from django.utils.translation import ugettext_lazy as _
+from django.utils.translation.trans_real import parse_accept_lang_header
+from rest_framework import serializers
+
+from . import conf, datastructures, fields
+from .serializers import translations_dict
+
+LANGUAGES_PARAMETER = u'languages'
+
+
+def requested_languages(request, parameter=LANGUAGES_PARAMETER,
+                        accept_language=False):
+    u"""
+    Returns the codes of the languages (in LANGUAGES) `request` asks for
+    through `parameter` or, when `accept_language` is True, its
+    `Accept-Language` header; None when it doesn't ask for any.
+    """
+    if request is None:
+        return None
+    codes = conf.settings.LANGUAGE_CODES
+    query_params = getattr(request, u'query_params', request.GET)
+    if query_params.get(parameter):
+        wanted = [
+            code.strip() for code in query_params[parameter].split(u',')
+        ]
+    elif accept_language and request.META.get(u'HTTP_ACCEPT_LANGUAGE'):
+        wanted = [
+            language for language, priority in parse_accept_lang_header(
+                request.META[u'HTTP_ACCEPT_LANGUAGE']
+            )
+        ]
+    else:
+        return None
+    by_lower = dict((code.lower(), code) for code in codes)
+    result = set()
+    for language in wanted:
+        language = language.lower()
+        code = by_lower.get(language) or by_lower.get(language.split(u'-')[0])
+        if code is not None:
+            result.add(code)
+    return result or None
+
+
+class MultiLingualField(serializers.Field):
+    u"""
+    Serializes multilingual values as {language code: text (or file URL)}
+    objects and deserializes {language code: text (or file name)} ones.
+    """
+    default_error_messages = {
+        u'invalid': _(
+            u'Expected an object mapping language codes to translations.'
+        ),
+        u'unknown_language': _(u'`{code}` is not an available language.'),
+    }
+
+    def __init__(self, accept_language=False,
+                 languages_parameter=LANGUAGES_PARAMETER, **kwargs):
+        self.accept_language = accept_language
+        self.languages_parameter = languages_parameter
+        super(MultiLingualField, self).__init__(**kwargs)
+
+    def get_languages(self):
+        return requested_languages(
+            self.context.get(u'request'), self.languages_parameter,
+            self.accept_language
+        )
+
+    def to_representation(self, value):
+        translations = translations_dict(value, self.get_languages())
+        if isinstance(value, datastructures.MultiLingualFile):
+            storage = value.storage
+            request = self.context.get(u'request')
+            for code, name in translations.items():
+                if name:
+                    url = storage.url(name)
+                    if request is not None:
+                        url = request.build_absolute_uri(url)
+                    translations[code] = url
+                else:
+                    translations[code] = None
+        return translations
+
+    def to_internal_value(self, data):
+        if not isinstance(data, dict):
+            self.fail(u'invalid')
+        codes = conf.settings.LANGUAGE_CODES
+        for code in data:
+            if code not in codes:
+                self.fail(u'unknown_language', code=code)
+        instance = getattr(self.parent, u'instance', None)
+        current = getattr(instance, self.source, None) if (
+            instance is not None and self.source != u'*') else None
+        translations = fields.translations_of(current)
+        translations.update(data)
+        return translations
@@ -0,0 +1,57 @@
+u"""
+A JSON serializer writing multilingual values as {language code: text}
+objects (file names for MultiLingualFileFields) instead of XML strings.
+
+Register it in your settings (replacing Django's `json` format, or under
+a name of its own)::
+
+    SERIALIZATION_MODULES = {'json': 'multilingualfield.serializers'}
+
+`serialize('json', queryset, languages=['en'])` only writes the given
+languages. Deserializing such output leaves the other languages empty.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from django.core.serializers import json
+
+from . import fields
+
+Deserializer = json.Deserializer
+
+
+def translations_dict(value, languages=None):
+    u"""
+    Returns the {language_code: text or file name} dict for `value`
+    (only with `languages` if given), or None for None.
+    """
+    if value is None:
+        return None
+    translations = fields.translations_of(value)
+    if languages is not None:
+        translations = dict(
+            (code, text) for code, text in translations.items()
+            if code in languages
+        )
+    return translations
+
+
+class Serializer(json.Serializer):
+    u"""Django's JSON serializer with multilingual values as objects."""
+    internal_use_only = False
+
+    def serialize(self, queryset, **options):
+        self.languages = options.pop(u'languages', None)
+        return super(Serializer, self).serialize(queryset, **options)
+
+    def handle_field(self, obj, field):
+        multilingual = (
+            fields.MultiLingualTextField, fields.MultiLingualFileField
+        )
+        if isinstance(field, multilingual):
+            self._current[field.name] = translations_dict(
+                field._get_val_from_obj(obj), self.languages
+            )
+        else:
+            super(Serializer, self).handle_field(obj, field)
@@ -0,0 +1,20 @@
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+from django.dispatch import Signal
+
+# Sent (when `MULTILINGUALFIELD_INSTRUMENTATION` is enabled) every time a
+# multilingual value is decoded, encoded, validated or when a language
+# lookup has to fall back. `event` is one of the `instrumentation.EVENTS`,
+# `duration` is in seconds (or None for events that aren't timed) and
+# `detail` is an optional string describing the event.
+instrumentation_event = Signal(providing_args=[u'event', u'duration', u'detail'])
+
+# Sent by the model (as `sender`) after `save()` stores an `instance` whose
+# multilingual `field` has translations that differ from the ones it was
+# loaded with. `languages` is the set of the codes of those translations
+# (every translated language when `created` is True).
+translations_changed = Signal(
+    providing_args=[u'instance', u'field', u'languages', u'created']
+)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'TranslationCoverage'
+        db.create_table(u'multilingualfield_translationcoverage', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('model', self.gf('django.db.models.fields.CharField')(max_length=100, db_index=True)),
+            ('field_name', self.gf('django.db.models.fields.CharField')(max_length=100)),
+            ('language_code', self.gf('django.db.models.fields.CharField')(max_length=15)),
+            ('translated', self.gf('django.db.models.fields.IntegerField')(default=0)),
+            ('total', self.gf('django.db.models.fields.IntegerField')(default=0)),
+        ))
+        db.send_create_signal(u'multilingualfield', ['TranslationCoverage'])
+
+        # Adding unique constraint on 'TranslationCoverage', fields ['model', 'field_name', 'language_code']
+        db.create_unique(u'multilingualfield_translationcoverage', ['model', 'field_name', 'language_code'])
+
+
+    def backwards(self, orm):
+        # Removing unique constraint on 'TranslationCoverage', fields ['model', 'field_name', 'language_code']
+        db.delete_unique(u'multilingualfield_translationcoverage', ['model', 'field_name', 'language_code'])
+
+        # Deleting model 'TranslationCoverage'
+        db.delete_table(u'multilingualfield_translationcoverage')
+
+
+    models = {
+        u'multilingualfield.translationcoverage': {
+            'Meta': {'unique_together': "((u'model', u'field_name', u'language_code'),)", 'object_name': 'TranslationCoverage'},
+            'field_name': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'language_code': ('django.db.models.fields.CharField', [], {'max_length': '15'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100', 'db_index': 'True'}),
+            'total': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'translated': ('django.db.models.fields.IntegerField', [], {'default': '0'})
+        }
+    }
+
+    complete_apps = ['multilingualfield']
\ No newline at end of file
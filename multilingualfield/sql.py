@@ -0,0 +1,170 @@
+u"""
+SQL snippets for inspecting multilingual values within the database.
+
+Multilingual values are stored as XML in which every translation lives in
+its own `<language code="xx">...</language>` element. An empty translation
+is stored as `<language code="xx"></language>` (or `<language code="xx"/>`)
+so a translation is present when its opening tag is followed by text.
+
+`translation_sql` extracts a single (still escaped) translation, so
+listings can select, sort and search one language without loading whole
+values, and `set_translation_sql` builds an expression that replaces (or adds) one
+translation within the stored XML, so a single language can be changed
+with an UPDATE and no Python round trip.
+"""
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals
+)
+
+import re
+
+from .utils import COMPRESSION_MARKER, escape_xml_text
+
+OPENING_TAG = u'<language code="{0}">'
+CLOSING_TAG = u'</language>'
+EMPTY_ELEMENT = OPENING_TAG + CLOSING_TAG
+SELF_CLOSING_ELEMENT = u'<language code="{0}"/>'
+ROOT_OPENING_TAG = u'<languages>'
+ROOT_CLOSING_TAG = u'</languages>'
+EMPTY_ROOT = u'<languages/>'
+PLACEHOLDER = re.compile(r'\{(\d+)\}')
+
+
+def translation_present_sql(column, language_code):
+    u"""
+    Returns a (sql, params) condition that is true when the XML in `column`
+    has a non-empty translation for `language_code`.
+
+    Uses LIKE only (no regular expressions) so it works on every backend.
+    """
+    return (
+        u'({0} LIKE %s AND {0} NOT LIKE %s)'.format(column),
+        [
+            u'%{0}%'.format(OPENING_TAG.format(language_code)),
+            u'%{0}%'.format(EMPTY_ELEMENT.format(language_code)),
+        ]
+    )
+
+
+def compressed_sql(column):
+    u"""
+    Returns a (sql, params) condition that is true when `column` holds a
+    compressed value (which the database can't look into).
+    """
+    return u'{0} LIKE %s'.format(column), [COMPRESSION_MARKER + u'%']
+
+
+def compose(template, *expressions):
+    u"""
+    Returns the (sql, params) expression `template` makes of `expressions`
+    ((sql, params) tuples it refers to as {0}, {1}...), with their params
+    in the order the template places them (which differs between backends,
+    see `position_sql`).
+    """
+    params = []
+    for index in PLACEHOLDER.findall(template):
+        params.extend(expressions[int(index)][1])
+    return template.format(*[sql for sql, _ in expressions]), params
+
+
+def param(value):
+    u"""Returns the (sql, params) expression of the parameter `value`."""
+    return u'%s', [value]
+
+
+def position_sql(connection, haystack, needle):
+    u"""
+    Returns a (sql, params) expression for the (1-based, 0 when missing)
+    position of `needle` within `haystack` ((sql, params) expressions).
+    """
+    if connection.vendor == u'postgresql':
+        return compose(u'STRPOS({0}, {1})', haystack, needle)
+    if connection.vendor == u'mysql':
+        return compose(u'LOCATE({1}, {0})', haystack, needle)
+    return compose(u'INSTR({0}, {1})', haystack, needle)
+
+
+def concat_sql(connection, *expressions):
+    u"""
+    Returns a (sql, params) expression concatenating `expressions` ((sql,
+    params) expressions).
+    """
+    placeholders = [u'{{{0}}}'.format(i) for i in range(len(expressions))]
+    if connection.vendor == u'mysql':
+        template = u'CONCAT({0})'.format(u', '.join(placeholders))
+    else:
+        template = u'({0})'.format(u' || '.join(placeholders))
+    return compose(template, *expressions)
+
+
+def translation_sql(connection, column, language_code):
+    u"""
+    Returns a (sql, params) expression evaluating to the `language_code`
+    translation in `column` (escaped as in the XML, see
+    `utils.unescape_xml_text`) or to an empty string when there's none.
+    """
+    column = (column, [])
+    opening_tag = OPENING_TAG.format(language_code)
+    start = compose(
+        u'({0} + {1})',
+        position_sql(connection, column, param(opening_tag)),
+        (unicode(len(opening_tag)), [])
+    )
+    rest = compose(u'SUBSTR({0}, {1})', column, start)
+    return compose(
+        u'CASE WHEN {0} > 0 THEN SUBSTR({1}, 1, {2} - 1) ELSE {3} END',
+        position_sql(connection, column, param(opening_tag)),
+        rest,
+        position_sql(connection, rest, param(CLOSING_TAG)),
+        param(u'')
+    )
+
+
+def set_translation_sql(connection, column, language_code, value):
+    u"""
+    Returns a (sql, params) expression evaluating to the XML in `column`
+    with the `language_code` translation set to `value`.
+
+    The translation is replaced when the element already exists (in either
+    of its empty forms too) and appended otherwise; NULL and empty values
+    become a document with just that translation. Compressed values can't
+    be modified this way.
+    """
+    column = (column, [])
+    opening_tag = OPENING_TAG.format(language_code)
+    self_closing = SELF_CLOSING_ELEMENT.format(language_code)
+    element = opening_tag + escape_xml_text(value or u'') + CLOSING_TAG
+    start = compose(
+        u'({0} + {1})',
+        position_sql(connection, column, param(opening_tag)),
+        (unicode(len(opening_tag)), [])
+    )
+    end = compose(
+        u'({0} + {1} - 1)',
+        start,
+        position_sql(
+            connection, compose(u'SUBSTR({0}, {1})', column, start),
+            param(CLOSING_TAG)
+        )
+    )
+    replaced = concat_sql(
+        connection,
+        compose(u'SUBSTR({0}, 1, {1} - 1)', column, start),
+        param(escape_xml_text(value or u'')),
+        compose(u'SUBSTR({0}, {1})', column, end)
+    )
+    return compose(
+        u'CASE'
+        u' WHEN {0} IS NULL OR {0} = {1} OR {0} = {2} THEN {3}'
+        u' WHEN {4} > 0 THEN {5}'
+        u' WHEN {6} > 0 THEN REPLACE({0}, {7}, {8})'
+        u' ELSE REPLACE({0}, {9}, {10})'
+        u' END',
+        column, param(u''), param(EMPTY_ROOT),
+        param(ROOT_OPENING_TAG + element + ROOT_CLOSING_TAG),
+        position_sql(connection, column, param(opening_tag)),
+        replaced,
+        position_sql(connection, column, param(self_closing)),
+        param(self_closing), param(element),
+        param(ROOT_CLOSING_TAG), param(element + ROOT_CLOSING_TAG)
+    )
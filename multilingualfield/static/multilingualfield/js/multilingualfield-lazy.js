@@ -0,0 +1,55 @@
+/*
+ * Loads the inputs of the translations a lazily-rendered multilingual
+ * widget left out (see MultiLingualFieldModelAdmin.lazy_multilingual_widgets)
+ * when their "Load translation" link is clicked.
+ *
+ * Tab scripts can load a translation up front by calling
+ * `multilingualfieldLoad(placeholder)` with its `.multilingual-lazy` element.
+ */
+(function () {
+    'use strict';
+
+    function load(placeholder) {
+        if (placeholder.getAttribute('data-loading')) {
+            return;
+        }
+        placeholder.setAttribute('data-loading', '1');
+        var request = new XMLHttpRequest();
+        request.open('GET', placeholder.getAttribute('data-url'));
+        request.onload = function () {
+            if (request.status !== 200) {
+                placeholder.removeAttribute('data-loading');
+                return;
+            }
+            var container = document.createElement('div');
+            container.innerHTML = request.responseText;
+            while (container.firstChild) {
+                placeholder.parentNode.insertBefore(
+                    container.firstChild, placeholder
+                );
+            }
+            placeholder.parentNode.removeChild(placeholder);
+        };
+        request.onerror = function () {
+            placeholder.removeAttribute('data-loading');
+        };
+        request.send();
+    }
+
+    window.multilingualfieldLoad = load;
+
+    document.addEventListener('click', function (event) {
+        var target = event.target;
+        if (!target.className || (' ' + target.className + ' ').indexOf(' multilingual-load ') === -1) {
+            return;
+        }
+        event.preventDefault();
+        var placeholder = target.parentNode;
+        while (placeholder && (' ' + placeholder.className + ' ').indexOf(' multilingual-lazy ') === -1) {
+            placeholder = placeholder.parentNode;
+        }
+        if (placeholder) {
+            load(placeholder);
+        }
+    });
+}());
@@ -2,12 +2,21 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals
 )
 
+import base64
+import zlib
+from xml.sax.saxutils import escape
+
 from django.core.files.storage import default_storage
-from lxml import objectify, etree
 
-from . import LANGUAGES, INVALID_XML_ERROR
+from . import interning, LANGUAGES, INVALID_XML_ERROR
+from .instrumentation import instrumented, DECODE, VALIDATION
+
+# Prepended to compressed values so they can be told apart from plain XML
+# (which always starts with '<')
+COMPRESSION_MARKER = u'zlib:'
 
 
+@instrumented(DECODE)
 def construct_MultiLingualText_from_xml(xml, instance):
     u"""
     Arguments:
@@ -28,27 +37,63 @@ def construct_MultiLingualText_from_xml(xml, instance):
 
     * `en` with a value of 'Hello'
     * `es` with a value of 'Hola'
+
+    Identical translations are shared with other instances while an intern
+    pool is active (see `multilingualfield.interning`).
     """
+    from lxml import etree
     try:
-        xml_as_python_object = objectify.fromstring(xml)
+        root = etree.fromstring(xml)
     except etree.XMLSyntaxError:
         raise Exception(INVALID_XML_ERROR + ' MultiLingualText')
-    else:
-        # Creating a dictionary of all the languages passed in the value XML
-        # with the language code (i.e. 'en', 'de', 'fr') as the key
-        text_dict = {}
-        try:
-            text_dict = dict(
-                (unicode(l.get(u'code')), unicode(l.text or u''))
-                for l in xml_as_python_object.language
-            )
-        except AttributeError:
-            # Empty fields throw-off lxml and cause an AttributeError
-            pass
-        for code, verbose in LANGUAGES:
-            setattr(instance, code, text_dict.get(code, u''))
+    # Creating a dictionary of all the languages passed in the value XML
+    # with the language code (i.e. 'en', 'de', 'fr') as the key
+    text_dict = dict(
+        (unicode(l.get(u'code')), unicode(l.text or u''))
+        for l in root.iterchildren(u'language')
+    )
+    pool = interning.get_pool()
+    if pool is not None:
+        for code, text in text_dict.items():
+            text_dict[code] = pool.intern(text)
+    for code, verbose in LANGUAGES:
+        setattr(instance, code, text_dict.get(code, u''))
 
 
+@instrumented(DECODE)
+def extract_languages(value, language_codes):
+    u"""
+    Returns a {language_code: text} dict holding the translations for
+    `language_codes` (and no others) found in `value`, a block of XML (as
+    stored in the database, possibly compressed).
+
+    Cheaper than building a MultiLingualText when only a few languages
+    are needed; languages missing from `value` are missing from the dict.
+    """
+    from lxml import etree
+    value = decompress_xml(value)
+    if not value:
+        return {}
+    if not value.startswith(u'<'):
+        # Plain text is treated as the first language (see MultiLingualText)
+        code = LANGUAGES[0][0]
+        return {code: value} if code in language_codes else {}
+    try:
+        root = etree.fromstring(value)
+    except etree.XMLSyntaxError:
+        raise Exception(INVALID_XML_ERROR + ' MultiLingualText')
+    wanted = set(language_codes)
+    text_dict = {}
+    for language in root.iterchildren(u'language'):
+        code = language.get(u'code')
+        if code in wanted:
+            text_dict[code] = unicode(language.text or u'')
+            if len(text_dict) == len(wanted):
+                break
+    return text_dict
+
+
+@instrumented(DECODE)
 def construct_MultiLingualFile_from_xml(xml, instance, storage=default_storage):
     u"""
     Arguments:
@@ -68,30 +113,93 @@ def construct_MultiLingualFile_from_xml(xml, instance, storage=default_storage):
     `instance` will now have two attributes:
     * `en` with a file stored at path/to/file.ext within `storage`
     * `es` with a file stored at path/to/file2.ext within `storage`
+
+    Only the file names are stored on `instance`; the files themselves are
+    created when each language is first accessed (see MultiLingualFile).
     """
-    from .datastructures import MultiLingualFieldFile
+    from lxml import etree
     try:
-        xml_as_python_object = objectify.fromstring(xml)
+        root = etree.fromstring(xml)
     except etree.XMLSyntaxError:
         raise Exception(INVALID_XML_ERROR + ' MultiLingualText')
-    else:
-        # Creating a dictionary of all the languages passed in the value XML
-        # with the language code (i.e. 'en', 'de', 'fr') as the key
-        text_dict = {}
-        try:
-            text_dict = dict(
-                (unicode(l.get('code')), unicode(l.text or u''))
-                for l in xml_as_python_object.language
-            )
-        except AttributeError:
-            # Empty fields throw-off lxml and cause an AttributeError
-            pass
-        for code, verbose in LANGUAGES:
-            setattr(
-                instance,
-                code,
-                MultiLingualFieldFile(
-                    storage=storage,
-                    name=text_dict[code]
-                ) if code in text_dict else None
+    # Creating a dictionary of all the languages passed in the value XML
+    # with the language code (i.e. 'en', 'de', 'fr') as the key
+    names = dict(
+        (unicode(l.get(u'code')), unicode(l.text or u''))
+        for l in root.iterchildren(u'language')
+    )
+    pool = interning.get_pool()
+    if pool is not None:
+        for code, name in names.items():
+            names[code] = pool.intern(name)
+    # Renditions of files that have been replaced since are left out
+    renditions = {}
+    for rendition in root.iterchildren(u'rendition'):
+        code = rendition.get(u'code')
+        if code in names and names[code] == rendition.get(u'source'):
+            renditions.setdefault(code, {})[rendition.get(u'name')] = unicode(
+                rendition.text or u''
             )
+    instance._storage = storage
+    instance._names = dict(
+        (code, names.get(code)) for code, verbose in LANGUAGES
+    )
+    instance._renditions = renditions
+
+
+@instrumented(VALIDATION)
+def validate_xml(xml):
+    u"""
+    Raises `lxml.etree.XMLSyntaxError` if `xml` isn't a well-formed
+    block of XML.
+    """
+    from lxml import objectify
+    objectify.fromstring(xml)
+
+
+def compress_xml(xml, threshold=0):
+    u"""
+    Returns `xml` zlib-compressed, base64-encoded and prefixed with
+    COMPRESSION_MARKER (so it can still be stored in a 'text' column).
+
+    `xml` is returned untouched if it is `threshold` characters long or
+    shorter.
+    """
+    if not xml or len(xml) <= threshold:
+        return xml
+    if isinstance(xml, unicode):
+        xml = xml.encode(u'utf-8')
+    return COMPRESSION_MARKER + base64.b64encode(
+        zlib.compress(xml)
+    ).decode(u'ascii')
+
+
+def decompress_xml(value):
+    u"""
+    Reverses `compress_xml`. Values without COMPRESSION_MARKER (i.e. rows
+    written before compression was enabled) are returned untouched.
+    """
+    if value and value.startswith(COMPRESSION_MARKER):
+        return zlib.decompress(
+            base64.b64decode(value[len(COMPRESSION_MARKER):])
+        ).decode(u'utf-8')
+    return value
+
+
+def escape_xml_text(text):
+    u"""
+    Returns `text` escaped exactly like the text of the `<language>`
+    elements written by `MultiLingualText.as_xml` (ASCII-only, with
+    character references for everything else).
+    """
+    return escape(text).replace(u'\r', u'&#13;').encode(
+        u'ascii', u'xmlcharrefreplace'
+    ).decode(u'ascii')
+
+
+def unescape_xml_text(text):
+    u"""Reverses `escape_xml_text`."""
+    from lxml import etree
+    if not text or u'&' not in text:
+        return text or u''
+    return unicode(etree.fromstring(u'<text>' + text + u'</text>').text or u'')
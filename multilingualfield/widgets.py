@@ -3,16 +3,24 @@ from __future__ import (
 )
 
 from django.forms.widgets import (
-    CheckboxInput, ClearableFileInput, HiddenInput,
+    CheckboxInput, ClearableFileInput, HiddenInput, Media,
     MultiWidget, Textarea, TextInput, FILE_INPUT_CONTRADICTION
 )
 from django.utils.encoding import force_text
 from django.utils.html import conditional_escape, format_html
+from django.utils.http import urlencode
 from django.utils.safestring import mark_safe
-from lxml import objectify
-from lxml.etree import XMLSyntaxError
+from django.utils.translation import ugettext_lazy as _
 
-from . import datastructures, LANGUAGES, INVALID_XML_ERROR
+from . import datastructures, utils, LANGUAGES, INVALID_XML_ERROR
+from .cache import current_language_code
+
+LAZY_JS = u'multilingualfield/js/multilingualfield-lazy.js'
+LAZY_PLACEHOLDER = (
+    u'<div class="input-prepend tab_element tab_link_{0} multilingual-lazy" '
+    u'data-url="{1}"><span class="add-on control-label">{2}</span>'
+    u'<a href="#" class="multilingual-load">{3}</a></div>'
+)
 
 
 class WidgetWithLanguageAddOn(object):
@@ -155,14 +163,33 @@ class CustomClearableFileInput(ClearableFileInput):
         return upload or data.get(self.initial_filename_name(name), None)
 
 
+class PartiallyLoadedValue(list):
+    u"""
+    The value submitted through a lazily-loaded widget: `not_loaded` holds
+    the indexes of the languages whose inputs were never loaded (and whose
+    values are None).
+    """
+
+    def __init__(self, values, not_loaded):
+        super(PartiallyLoadedValue, self).__init__(values)
+        self.not_loaded = not_loaded
+
+
 class MultiLingualFieldBaseMixInWidget(object):
     u"""
     The 'base' multilingual field widget. Returns a widget (as specified by
     the `for_each_field_widget` attribute) for each language specified in
     settings.LANGUAGES.
+
+    When `load_url` is set only the active language is rendered; the
+    inputs of the other languages are fetched from `load_url` (see
+    `MultiLingualFieldModelAdmin.lazy_multilingual_widgets`) when requested
+    and languages never loaded are left out of the submitted value.
     """
 
     for_each_field_widget = None
+    load_url = None
+    load_text = _(u'Load translation')
 
     def __init__(self, attrs=None):
         widgets = [
@@ -172,9 +199,12 @@ class MultiLingualFieldBaseMixInWidget(object):
         super(MultiLingualFieldBaseMixInWidget, self).__init__(widgets, attrs)
 
     def render(self, name, value, attrs=None):
-        rendered_widget = super(
-            MultiLingualFieldBaseMixInWidget, self
-        ).render(name, value, attrs)
+        if self.load_url is None:
+            rendered_widget = super(
+                MultiLingualFieldBaseMixInWidget, self
+            ).render(name, value, attrs)
+        else:
+            rendered_widget = self.render_lazily(name, value, attrs)
         return mark_safe(
             '<div class="multilingual-mod %s">%s</div>' % (
                 self.__class__.__name__.lower(),
@@ -182,6 +212,76 @@ class MultiLingualFieldBaseMixInWidget(object):
             )
         )
 
+    @property
+    def media(self):
+        u"""Adds the script loading the other languages to lazy widgets."""
+        media = super(MultiLingualFieldBaseMixInWidget, self).media
+        if self.load_url is not None:
+            media = media + Media(js=(LAZY_JS,))
+        return media
+
+    def render_lazily(self, name, value, attrs=None):
+        u"""
+        Renders the inputs of the active language (and of every language
+        whose submitted value is being redisplayed) and placeholders for
+        the rest.
+        """
+        if isinstance(value, list):
+            not_loaded = getattr(value, u'not_loaded', ())
+        else:
+            value = self.decompress(value)
+            codes = [code for code, verbose in LANGUAGES]
+            code = current_language_code()
+            active = codes.index(code) if code in codes else 0
+            not_loaded = [i for i in range(len(codes)) if i != active]
+        final_attrs = self.build_attrs(attrs)
+        id_ = final_attrs.get(u'id', None)
+        output = []
+        for i, (code, verbose) in enumerate(LANGUAGES):
+            language_id = u'{0}_{1}'.format(id_, i) if id_ else None
+            if i in not_loaded:
+                query = {u'language': code, u'name': name}
+                if language_id:
+                    query[u'id'] = language_id
+                output.append(format_html(
+                    LAZY_PLACEHOLDER, code,
+                    u'{0}?{1}'.format(self.load_url, urlencode(query)),
+                    verbose, self.load_text
+                ))
+            else:
+                output.append(self.render_language(
+                    name, i, value[i], dict(final_attrs, id=language_id)
+                    if language_id else final_attrs
+                ))
+        return self.format_output(output)
+
+    def render_language(self, name, index, value, attrs=None):
+        u"""
+        Renders the input of the `index`-th language along with the hidden
+        input marking it as loaded.
+        """
+        return self.widgets[index].render(
+            u'{0}_{1}'.format(name, index), value, attrs
+        ) + HiddenInput().render(self.loaded_marker_name(name, index), u'1')
+
+    def loaded_marker_name(self, name, index):
+        return u'{0}_{1}_loaded'.format(name, index)
+
+    def value_from_datadict(self, data, files, name):
+        value = super(
+            MultiLingualFieldBaseMixInWidget, self
+        ).value_from_datadict(data, files, name)
+        if self.load_url is None:
+            return value
+        not_loaded = [
+            i for i in range(len(self.widgets))
+            if self.loaded_marker_name(name, i) not in data
+        ]
+        return PartiallyLoadedValue(
+            [None if i in not_loaded else v for i, v in enumerate(value)],
+            not_loaded
+        )
+
 
 class MultiLingualTextFieldWidget(MultiLingualFieldBaseMixInWidget,
                                   MultiWidget):
@@ -201,33 +301,21 @@ class MultiLingualTextFieldWidget(MultiLingualFieldBaseMixInWidget,
         to the current ordering of settings.LANGUAGES.
         """
         text_dict = {}
-        if value:
+        if isinstance(value, datastructures.MultiLingualText):
             # Both MultiLingualCharField and MultiLingualTextField instances
-            # provide `MultiLingualText` instances by default but handling
-            # for raw XML has been included for convenience.
-            if isinstance(value, datastructures.MultiLingualText):
-                text_dict = dict(
-                    (code, getattr(value, code))
-                    for code, verbose in LANGUAGES
+            # (and their form fields) provide `MultiLingualText` instances
+            text_dict = value.__dict__
+        elif value:
+            # Handling for raw XML has been included for convenience
+            try:
+                text_dict = utils.extract_languages(
+                    value, [code for code, verbose in LANGUAGES]
+                )
+            except Exception:
+                raise Exception(
+                    '%s MultiLingualTextFieldWidget.decompress()!' %
+                    INVALID_XML_ERROR
                 )
-            else:
-                # Converting XML (passed-in as `value`) to a python object
-                # via lxml
-                try:
-                    xml_as_python_object = objectify.fromstring(value)
-                except XMLSyntaxError:
-                    raise Exception(
-                        '%s MultiLingualTextFieldWidget.decompress()!' %
-                        INVALID_XML_ERROR
-                    )
-                else:
-                    # Creating a dictionary of all the languages passed in the
-                    # value XML with the language code (i.e. 'en', 'de', 'fr')
-                    # as the key
-                    text_dict = dict(
-                        (unicode(l.code), unicode(l.language_text or u''))
-                        for l in xml_as_python_object.language
-                    )
         # Returning text from XML tree in order dictated by LANGUAGES
         return [text_dict.get(code, u'') for code, verbose in LANGUAGES]
 
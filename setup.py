@@ -4,7 +4,7 @@ from setuptools import find_packages
 
 setup(
     name='django-multilingualfield',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     version='0.3.1',
     author=u'Jonathan Ellenberger',
     author_email='jonathan_ellenberger@wgbh.org',
@@ -21,7 +21,9 @@ setup(
     ],
     package_data={
         'multilingualfield': [
-            'static/multilingualfield/css/*.css'
+            'static/multilingualfield/css/*.css',
+            'static/multilingualfield/js/*.js',
+            'templates/multilingualfield/panels/*.html',
         ]
     },
     classifiers=[